@@ -0,0 +1,101 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import urlencode
+from rest_framework.response import Response
+
+# cache entries are never deleted one by one: every key embeds the current version of its
+# namespace, and bumping the version makes all older entries unreachable until they expire
+FACETS = 'advertisement-facets'
+ADVERTISEMENTS = 'advertisements'
+CATEGORIES = 'categories'
+# user profiles embedded in other payloads (advertisement owners, review authors)
+USERS = 'users'
+
+
+def get_version(namespace):
+    key = f'{namespace}:version'
+    version = cache.get(key)
+    if version is None:
+        # start from the clock so an evicted counter never reuses an old version number
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(*namespaces):
+    for namespace in namespaces:
+        key = f'{namespace}:version'
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(time.time() * 1000), None)
+
+
+def bump_version_on_commit(*namespaces):
+    # bumped before the commit, a concurrent request could cache the old rows under the new version
+    transaction.on_commit(lambda: bump_version(*namespaces))
+
+
+def normalized_query(request):
+    params = sorted((key, sorted(request.query_params.getlist(key))) for key in request.query_params)
+    return urlencode(params, doseq=True)
+
+
+def user_role(request):
+    return 'staff' if request.user.is_staff else 'public'
+
+
+def make_key(namespace, request, *parts):
+    # host and path are part of the key because paginated payloads embed absolute links
+    url = f'{request.get_host()}{request.path}?{normalized_query(request)}'
+    digest = hashlib.md5(url.encode(), usedforsecurity=False).hexdigest()
+    return ':'.join([namespace, str(get_version(namespace)), user_role(request), *map(str, parts), digest])
+
+
+def count(namespace, counter):
+    key = f'{namespace}:{counter}'
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def get_counters(*namespaces):
+    counters = {}
+    for namespace in namespaces:
+        values = cache.get_many([f'{namespace}:hits', f'{namespace}:misses'])
+        counters[namespace] = {
+            'hits': values.get(f'{namespace}:hits', 0),
+            'misses': values.get(f'{namespace}:misses', 0),
+        }
+    return counters
+
+
+class CachedReadMixin:
+    # caches the payload of `list`/`retrieve` per query string and user role,
+    # invalidated by bumping `cache_namespace` (see advertisement.signals)
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, view_method, request, *args, **kwargs):
+        cache_key = make_key(self.cache_namespace, request, self.action)
+        data = cache.get(cache_key)
+        if data is not None:
+            count(self.cache_namespace, 'hits')
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        count(self.cache_namespace, 'misses')
+        response = view_method(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(cache_key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,72 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from advertisement import caching
+
+
+class ConditionalGetMixin:
+    # ETag/Last-Modified for `list`/`retrieve` computed from one aggregate (row count and newest
+    # `updated_at`) over the rows the response would contain, so a 304 skips serialization entirely.
+    # With a `cache_namespace` the aggregate runs once per version of it. The versions of the namespaces
+    # are part of the ETag, so changes `updated_at` does not see (e.g. owner profiles) still move it
+    last_modified_field = 'updated_at'
+    validator_namespaces = []
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, lambda: self.filter_queryset(self.get_queryset()), request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return self.conditional_response(
+            super().retrieve,
+            lambda: self.filter_queryset(self.get_queryset()).filter(**{self.lookup_field: kwargs[lookup_url_kwarg]}),
+            request, *args, **kwargs
+        )
+
+    def get_validators(self, queryset):
+        return queryset.order_by().aggregate(count=Count('pk'), last_modified=Max(self.last_modified_field))
+
+    def get_cached_validators(self, request, get_queryset):
+        cache_namespace = getattr(self, 'cache_namespace', None)
+        if cache_namespace is None:
+            return self.get_validators(get_queryset())
+
+        cache_key = caching.make_key(cache_namespace, request, self.action, 'validators')
+        validators = cache.get(cache_key)
+        if validators is None:
+            validators = self.get_validators(get_queryset())
+            cache.set(cache_key, validators, settings.RESPONSE_CACHE_TIMEOUT)
+        return validators
+
+    def conditional_response(self, view_method, get_queryset, request, *args, **kwargs):
+        try:
+            validators = self.get_cached_validators(request, get_queryset)
+        except (TypeError, ValueError, ValidationError):
+            # malformed lookups are reported by the view itself
+            return view_method(request, *args, **kwargs)
+
+        namespaces = [*self.validator_namespaces, *filter(None, [getattr(self, 'cache_namespace', None)])]
+        versions = ':'.join(str(caching.get_version(namespace)) for namespace in namespaces)
+        last_modified = validators['last_modified']
+        fingerprint = f"{caching.user_role(request)}:{request.get_full_path()}:{versions}:{validators['count']}:{last_modified and last_modified.isoformat()}"
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+        etag = quote_etag(hashlib.md5(fingerprint.encode(), usedforsecurity=False).hexdigest())
+
+        conditional_response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if conditional_response is not None:
+            return self.set_validator_headers(conditional_response, etag, last_modified)
+
+        response = view_method(request, *args, **kwargs)
+        if response.status_code == 200:
+            self.set_validator_headers(response, etag, last_modified)
+        return response
+
+    def set_validator_headers(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
@@ -0,0 +1,79 @@
+from collections import Counter, defaultdict
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from advertisement.models import Advertisement, Category
+
+STATUS_COUNTERS = {
+    Advertisement.PENDING: 'pending_count',
+    Advertisement.APPROVED: 'approved_count',
+    Advertisement.REJECTED: 'rejected_count',
+}
+RENTED_COUNTER = 'rented_count'
+COUNTERS = [*STATUS_COUNTERS.values(), RENTED_COUNTER]
+
+
+def counted_in(values):
+    # the counters one advertisement (its status, category_id and is_rented) adds 1 to
+    counters = [STATUS_COUNTERS[values['status']]] if values['status'] in STATUS_COUNTERS else []
+    if values['is_rented']:
+        counters.append(RENTED_COUNTER)
+    return counters
+
+
+def apply_counter_changes(changes):
+    # `changes` maps category_id -> {counter: delta}, one F() UPDATE per category so concurrent changes add up
+    changed = False
+    for category_id, deltas in changes.items():
+        deltas = {counter: delta for counter, delta in deltas.items() if delta}
+        if category_id is None or not deltas:
+            continue
+        Category.objects.filter(pk=category_id).update(
+            updated_at=timezone.now(),
+            **{counter: F(counter) + delta for counter, delta in deltas.items()}
+        )
+        changed = True
+    return changed
+
+
+def listing_changed(old=None, new=None):
+    return listings_changed([(old, new)])
+
+
+def listings_changed(transitions):
+    # `transitions` is a list of (old values, new values) pairs, applied together with one UPDATE per category
+    changes = defaultdict(Counter)
+    for old, new in transitions:
+        for values, delta in ((old, -1), (new, 1)):
+            if values:
+                for counter in counted_in(values):
+                    changes[values['category_id']][counter] += delta
+    return apply_counter_changes(changes)
+
+
+def listings_created(advertisements):
+    # for bulk_create, which sends no signals
+    changes = defaultdict(Counter)
+    for advertisement in advertisements:
+        for counter in counted_in({'status': advertisement.status, 'is_rented': advertisement.is_rented}):
+            changes[advertisement.category_id][counter] += 1
+    return apply_counter_changes(changes)
+
+
+def actual_counters():
+    rows = Advertisement.objects.order_by().values('category').annotate(
+        **{counter: Count('id', filter=Q(status=status)) for status, counter in STATUS_COUNTERS.items()},
+        **{RENTED_COUNTER: Count('id', filter=Q(is_rented=True))}
+    )
+    return {row.pop('category'): row for row in rows}
+
+
+def find_drift():
+    # [(category, stored counters, actual counters)] for every category whose counters are off
+    actual = actual_counters()
+    drift = []
+    for category in Category.objects.only('id', 'name', *COUNTERS).order_by('id'):
+        stored = {counter: getattr(category, counter) for counter in COUNTERS}
+        expected = actual.get(category.pk, dict.fromkeys(COUNTERS, 0))
+        if stored != expected:
+            drift.append((category, stored, expected))
+    return drift
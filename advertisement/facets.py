@@ -0,0 +1,44 @@
+from collections import Counter
+from django.db.models import Case, Count, IntegerField, Value, When
+
+# lower bounds of the rental amount buckets shown in the filter sidebar, the last one is open ended
+PRICE_BUCKETS = [0, 5000, 10000, 20000, 50000]
+
+
+def price_bucket_expression():
+    return Case(
+        *[When(rental_amount__lt=upper, then=Value(index)) for index, upper in enumerate(PRICE_BUCKETS[1:])],
+        default=Value(len(PRICE_BUCKETS) - 1),
+        output_field=IntegerField()
+    )
+
+
+def compute_facets(queryset):
+    # one GROUP BY over every facet dimension, the per-facet counts are rolled up from its rows
+    rows = queryset.select_related(None).prefetch_related(None).order_by().values(
+        'category_id', 'category__name', 'bedroom', 'bathroom', price_bucket=price_bucket_expression()
+    ).annotate(count=Count('id'))
+
+    categories, category_names = Counter(), {}
+    bedrooms, bathrooms, prices = Counter(), Counter(), Counter()
+    for row in rows:
+        categories[row['category_id']] += row['count']
+        category_names[row['category_id']] = row['category__name']
+        bedrooms[row['bedroom']] += row['count']
+        bathrooms[row['bathroom']] += row['count']
+        prices[row['price_bucket']] += row['count']
+
+    bounds = PRICE_BUCKETS + [None]
+    return {
+        'total': sum(categories.values()),
+        'categories': [
+            {'id': category_id, 'name': category_names[category_id], 'count': count}
+            for category_id, count in categories.most_common()
+        ],
+        'bedroom': [{'value': value, 'count': bedrooms[value]} for value in sorted(bedrooms)],
+        'bathroom': [{'value': value, 'count': bathrooms[value]} for value in sorted(bathrooms)],
+        'rental_amount': [
+            {'min': bounds[index], 'max': bounds[index + 1], 'count': prices[index]}
+            for index in range(len(PRICE_BUCKETS))
+        ],
+    }
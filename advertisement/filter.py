@@ -1,12 +1,68 @@
-from django_filters.rest_framework import FilterSet
+from django import forms
+from django_filters.rest_framework import FilterSet, Filter, NumberFilter, ChoiceFilter
+from rest_framework import exceptions
 from advertisement.models import Advertisement
+from advertisement.paginations import AdvertisementPagination
+from advertisement import geo
+
+
+class LatLngField(forms.CharField):
+    def clean(self, value):
+        value = super().clean(value)
+        if not value:
+            return None
+        try:
+            latitude, longitude = (float(part) for part in value.split(','))
+        except ValueError:
+            raise forms.ValidationError('Enter the point as `latitude,longitude`.')
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise forms.ValidationError('Latitude must be between -90 and 90 and longitude between -180 and 180.')
+        return latitude, longitude
+
+
+class LatLngFilter(Filter):
+    field_class = LatLngField
+
 
 class AdvertiseFilter(FilterSet):
+    DEFAULT_RADIUS_KM = 5
+
+    near = LatLngFilter(method='filter_near', label='Point as `latitude,longitude`, results are sorted by distance. Not available with `pagination=cursor`')
+    radius = NumberFilter(method='filter_radius', min_value=0, max_value=500, label='Search radius in km for `near`, 0 to 500 (default 5)')
+
     class Meta:
         model = Advertisement
         fields = {
             'category_id': ['exact'],
             'rental_amount' : ['gt', 'lt'],
             'bedroom': ['exact'],
-            'bathroom': ['exact']
-        }
\ No newline at end of file
+            'bathroom': ['exact'],
+            'is_rented': ['exact']
+        }
+
+    def filter_near(self, queryset, name, value):
+        # cursor pages are keyed on the listing sort, they can not follow the distance order
+        pagination = AdvertisementPagination
+        if self.request is not None and self.request.query_params.get(pagination.mode_query_param) == pagination.cursor_mode:
+            raise exceptions.ValidationError({'near': [f'`near` can not be combined with `{pagination.mode_query_param}={pagination.cursor_mode}`, use page numbers.']})
+
+        latitude, longitude = value
+        radius = self.form.cleaned_data.get('radius')
+        if radius is None:
+            radius = self.DEFAULT_RADIUS_KM
+        return geo.filter_within_radius(queryset, latitude, longitude, float(radius))
+
+    def filter_radius(self, queryset, name, value):
+        # only used together with `near`
+        return queryset
+
+
+class ModerationFilter(AdvertiseFilter):
+    status = ChoiceFilter(choices=Advertisement.STATUS_CHOICES, label='Pending by default, send an empty `status=` for every status')
+
+    def __init__(self, data=None, *args, **kwargs):
+        # the moderation queue shows pending advertisements unless asked otherwise
+        if data is not None and 'status' not in data:
+            data = data.copy()
+            data['status'] = Advertisement.PENDING
+        super().__init__(data, *args, **kwargs)
@@ -0,0 +1,101 @@
+from math import cos, radians
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+# precision stored on every advertisement, 9 characters is a cell of roughly 5m x 5m
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    geohash = []
+    bits = bit_count = 0
+    even = True
+
+    while len(geohash) < precision:
+        value_range, value = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (value_range[0] + value_range[1]) / 2
+        if value >= middle:
+            bits = bits * 2 + 1
+            value_range[0] = middle
+        else:
+            bits = bits * 2
+            value_range[1] = middle
+        even = not even
+        bit_count += 1
+
+        if bit_count == 5:
+            geohash.append(BASE32[bits])
+            bits = bit_count = 0
+
+    return ''.join(geohash)
+
+
+def cell_size(precision):
+    # (height, width) of a geohash cell in degrees, longitude takes the odd bit
+    lat_bits = precision * 5 // 2
+    lng_bits = precision * 5 - lat_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def precision_for_radius(latitude, radius_km):
+    # finest precision whose cells are still at least `radius_km` wide, so the 3x3 block
+    # around the centre cell covers the whole search circle
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        height_km = height * KM_PER_DEGREE
+        width_km = width * KM_PER_DEGREE * cos(radians(latitude))
+        if min(height_km, width_km) >= radius_km:
+            return precision
+    return 0
+
+
+def covering_cells(latitude, longitude, radius_km):
+    precision = precision_for_radius(latitude, radius_km)
+    if precision == 0:
+        # near the poles even the widest cells are narrower than the radius: every precision 1 cell of the
+        # latitude band around the point, one or two rows of 8 cells
+        height, width = cell_size(1)
+        spread = radius_km / KM_PER_DEGREE
+        return sorted({
+            encode(row * height - 90.0 + height / 2, column * width - 180.0 + width / 2, 1)
+            for row in range(int(180 / height)) for column in range(int(360 / width))
+            if row * height - 90.0 <= latitude + spread and (row + 1) * height - 90.0 >= latitude - spread
+        })
+
+    height, width = cell_size(precision)
+    cells = set()
+    for lat_step in (-1, 0, 1):
+        for lng_step in (-1, 0, 1):
+            cell_latitude = max(-90.0, min(90.0, latitude + lat_step * height))
+            cell_longitude = (longitude + lng_step * width + 180.0) % 360.0 - 180.0
+            cells.add(encode(cell_latitude, cell_longitude, precision))
+    return sorted(cells)
+
+
+def distance_expression(latitude, longitude):
+    # haversine distance in km between the row and the given point
+    delta_latitude = Radians(F('latitude') - Value(latitude))
+    delta_longitude = Radians(F('longitude') - Value(longitude))
+    a = Power(Sin(delta_latitude / 2), 2) + Cos(Value(radians(latitude))) * Cos(Radians(F('latitude'))) * Power(Sin(delta_longitude / 2), 2)
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(a), output_field=FloatField())
+
+
+def filter_within_radius(queryset, latitude, longitude, radius_km):
+    cells = covering_cells(latitude, longitude, radius_km)
+    if cells:
+        # prefix lookups on the indexed geohash column narrow the rows before any distance math
+        cell_filter = Q()
+        for cell in cells:
+            cell_filter |= Q(geohash__startswith=cell)
+        queryset = queryset.filter(cell_filter)
+    else:
+        queryset = queryset.filter(latitude__isnull=False, longitude__isnull=False)
+
+    return queryset.annotate(
+        distance=distance_expression(latitude, longitude)
+    ).filter(distance__lte=radius_km).order_by('distance', 'id')
@@ -0,0 +1,187 @@
+import csv
+import json
+import time
+from itertools import islice
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models.functions import Lower
+from rest_framework import serializers
+from advertisement import caching, counters
+from advertisement.models import Advertisement, AdvertisementImage, Category
+from advertisement.serializers import AdvertisementSerializer
+from advertisement.similarity import similar_listings
+from advertisement.typeahead import typeahead
+from users.models import User
+
+# csv cells that hold a list, e.g. "image/upload/v1/a.jpg|image/upload/v1/b.jpg"
+LIST_SEPARATOR = '|'
+
+
+def read_rows(path, file_format=None):
+    # yields (line number, row) one at a time, the file is never loaded as a whole
+    file_format = file_format or ('csv' if path.endswith('.csv') else 'jsonl')
+    with open(path, newline='', encoding='utf-8-sig') as file:
+        if file_format == 'csv':
+            reader = csv.DictReader(file)
+            for row in reader:
+                # empty cells are missing values, not empty strings
+                yield reader.line_num, {key: value for key, value in row.items() if value != ''}
+        else:
+            for line_number, line in enumerate(file, start=1):
+                if line.strip():
+                    try:
+                        yield line_number, json.loads(line)
+                    except ValueError as error:
+                        yield line_number, error
+
+
+def normalize_email(value):
+    # emails are matched case insensitively, like the `__iexact` lookups elsewhere
+    return str(value).strip().lower()
+
+
+def emails_in_database(emails):
+    # lowercased email -> user id, whatever case the stored address is in
+    return dict(User.objects.annotate(email_lower=Lower('email')).filter(email_lower__in=emails).values_list('email_lower', 'id'))
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+class ImportUserSerializer(serializers.ModelSerializer):
+    # the email is checked against the database once per batch instead of a UniqueValidator query per row
+    email = serializers.EmailField(max_length=254)
+
+    class Meta:
+        model = User
+        fields = ['email', 'first_name', 'last_name', 'address', 'phone_number']
+
+    def validate_email(self, value):
+        value = normalize_email(value)
+        if value in self.context['existing_emails']:
+            raise serializers.ValidationError('A user with this email already exists.')
+        return value
+
+
+class ImportAdvertisementSerializer(AdvertisementSerializer):
+    # same field rules as the API, with the category and owner resolved from per batch lookups
+    category = serializers.IntegerField()
+    owner_email = serializers.EmailField(write_only=True)
+    images = serializers.ListField(child=serializers.CharField(max_length=255), required=False, write_only=True)
+
+    class Meta(AdvertisementSerializer.Meta):
+        fields = ['title', 'description', 'category', 'owner_email', 'rental_amount', 'location', 'latitude', 'longitude', 'bedroom', 'bathroom', 'apartment_size', 'images']
+
+    def to_internal_value(self, data):
+        if isinstance(data.get('images'), str):
+            data = {**data, 'images': [image.strip() for image in data['images'].split(LIST_SEPARATOR) if image.strip()]}
+        return super().to_internal_value(data)
+
+    def validate_category(self, value):
+        if value not in self.context['category_ids']:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return value
+
+    def validate_owner_email(self, value):
+        owner_id = self.context['owners'].get(normalize_email(value))
+        if owner_id is None:
+            raise serializers.ValidationError('No user with this email.')
+        return owner_id
+
+
+class Importer:
+    # validates and inserts one batch per transaction, a bad row is reported and skipped, it never
+    # rolls back the rows around it
+    def __init__(self, batch_size=1000, on_reject=None, on_progress=None):
+        self.batch_size = batch_size
+        self.on_reject = on_reject or (lambda line, errors: None)
+        self.on_progress = on_progress or (lambda imported, rejected, rate: None)
+        self.imported = self.rejected = 0
+        self.started = None
+
+    def validate(self, serializer, batch):
+        valid = []
+        for line, row in batch:
+            if not isinstance(row, dict):
+                # a line that is not valid JSON comes through as its parse error
+                self.reject(line, {'non_field_errors': [str(row) if isinstance(row, ValueError) else 'Expected an object.']})
+                continue
+            try:
+                valid.append((line, serializer.run_validation(row)))
+            except serializers.ValidationError as error:
+                self.reject(line, error.detail)
+        return valid
+
+    def reject(self, line, errors):
+        self.rejected += 1
+        self.on_reject(line, errors)
+
+    def run(self, rows, import_batch):
+        self.imported = self.rejected = 0
+        self.started = time.perf_counter()
+        for batch in batched(rows, self.batch_size):
+            with transaction.atomic():
+                self.imported += import_batch(batch)
+            rate = self.imported / max(time.perf_counter() - self.started, 1e-9)
+            self.on_progress(self.imported, self.rejected, rate)
+        return self.imported, self.rejected
+
+    def import_users(self, rows):
+        return self.run(rows, self.import_user_batch)
+
+    def import_user_batch(self, batch):
+        emails = {normalize_email(row.get('email', '')) for line, row in batch if isinstance(row, dict)}
+        existing_emails = set(emails_in_database(emails))
+        serializer = ImportUserSerializer(context={'existing_emails': existing_emails})
+
+        users = []
+        for line, data in self.validate(serializer, batch):
+            if data['email'] in existing_emails:
+                # a duplicate inside the file itself
+                self.reject(line, {'email': [f"{data['email']} appears more than once."]})
+                continue
+            existing_emails.add(data['email'])
+            # imported users sign in after a password reset, hashing one password per row would dominate the import
+            users.append(User(password=make_password(None), **data))
+        User.objects.bulk_create(users, batch_size=self.batch_size)
+        return len(users)
+
+    def import_advertisements(self, rows, status=Advertisement.PENDING):
+        self.status = status
+        self.category_ids = set(Category.objects.values_list('id', flat=True))
+        imported = self.run(rows, self.import_advertisement_batch)
+        caching.bump_version_on_commit(caching.ADVERTISEMENTS, caching.CATEGORIES, caching.FACETS)
+        if status == Advertisement.APPROVED:
+            # bulk_create sends no post_save, the in-process suggestion and similarity indexes load again instead
+            transaction.on_commit(typeahead.invalidate)
+            transaction.on_commit(similar_listings.invalidate)
+        return imported
+
+    def import_advertisement_batch(self, batch):
+        emails = {normalize_email(row['owner_email']) for line, row in batch if isinstance(row, dict) and row.get('owner_email')}
+        owners = emails_in_database(emails)
+        serializer = ImportAdvertisementSerializer(context={'category_ids': self.category_ids, 'owners': owners})
+
+        advertisements, images = [], []
+        for line, data in self.validate(serializer, batch):
+            images.append(data.pop('images', []))
+            advertisement = Advertisement(
+                status=self.status,
+                category_id=data.pop('category'),
+                owner_id=data.pop('owner_email'),
+                **data
+            )
+            # bulk_create skips save()
+            advertisement.set_geohash()
+            advertisements.append(advertisement)
+
+        Advertisement.objects.bulk_create(advertisements, batch_size=self.batch_size)
+        counters.listings_created(advertisements)
+        AdvertisementImage.objects.bulk_create(
+            [AdvertisementImage(advertisement=advertisement, image=image) for advertisement, paths in zip(advertisements, images) for image in paths],
+            batch_size=self.batch_size
+        )
+        return len(advertisements)
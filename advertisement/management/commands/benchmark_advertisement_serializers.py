@@ -0,0 +1,65 @@
+import timeit
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from advertisement.fast_serializers import AdvertisementRowSerializer
+from advertisement.models import Advertisement, AdvertisementImage, Category
+from advertisement.serializers import AdvertisementSerializer
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Compare AdvertisementSerializer with the values() fast path on one list page and check both render the same bytes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100, help='Advertisements on the benchmarked page')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--images', type=int, default=3, help='Images per generated advertisement')
+
+    def create_rows(self, count, images):
+        # throwaway rows, rolled back when the benchmark finishes
+        owner = User.objects.create_user(email='benchmark-owner@example.com', first_name='Bench', last_name='Owner')
+        category = Category.objects.create(name='Benchmark')
+        advertisements = Advertisement.objects.bulk_create([
+            Advertisement(
+                title=f'Benchmark flat {index}', description='Benchmark description ' * 20, owner=owner, category=category,
+                status=Advertisement.APPROVED, rental_amount=Decimal(10000 + index), location='Benchmark Road',
+                bedroom=2, bathroom=1, apartment_size=Decimal('850.50')
+            )
+            for index in range(count)
+        ])
+        AdvertisementImage.objects.bulk_create([
+            AdvertisementImage(advertisement=advertisement, image=f'advertisement/images/benchmark_{advertisement.pk}_{index}')
+            for advertisement in advertisements for index in range(images)
+        ])
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        renderer = JSONRenderer()
+
+        with transaction.atomic():
+            missing = rows - Advertisement.objects.count()
+            if missing > 0:
+                self.create_rows(missing, options['images'])
+
+            page = Advertisement.objects.order_by('id')
+            row_serializer = AdvertisementRowSerializer()
+
+            def serializer_path():
+                queryset = page.select_related('owner').prefetch_related('images')[:rows]
+                return renderer.render(AdvertisementSerializer(queryset, many=True).data)
+
+            def fast_path():
+                return renderer.render(row_serializer.serialize(row_serializer.values(page)[:rows]))
+
+            if serializer_path() != fast_path():
+                raise CommandError('The fast path output differs from AdvertisementSerializer')
+
+            serializer_time = min(timeit.repeat(serializer_path, number=1, repeat=repeat))
+            fast_time = min(timeit.repeat(fast_path, number=1, repeat=repeat))
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'AdvertisementSerializer: {serializer_time * 1000:.2f} ms per {rows} rows')
+        self.stdout.write(f'Fast path:               {fast_time * 1000:.2f} ms per {rows} rows')
+        self.stdout.write(self.style.SUCCESS(f'Identical output, {serializer_time / fast_time:.1f}x faster'))
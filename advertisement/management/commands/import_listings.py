@@ -0,0 +1,54 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from advertisement.imports import Importer, read_rows
+from advertisement.models import Advertisement
+
+
+class Command(BaseCommand):
+    help = 'Import partner users and advertisements (with their image paths) from CSV or JSON Lines files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', help='Users file, one row per user: email, first_name, last_name, address, phone_number')
+        parser.add_argument('--advertisements', help='Advertisements file, rows reference their owner by `owner_email` and may list `images` (csv: separated by "|")')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='File format, guessed from the file extension by default')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows validated and inserted per transaction')
+        parser.add_argument('--status', choices=[choice for choice, label in Advertisement.STATUS_CHOICES], default=Advertisement.PENDING, help='Status of the imported advertisements')
+        parser.add_argument('--rejects', help='Write rejected rows with their errors to this JSON Lines file')
+
+    def handle(self, *args, **options):
+        if not options['users'] and not options['advertisements']:
+            raise CommandError('Nothing to import, pass --users and/or --advertisements')
+
+        rejects = open(options['rejects'], 'w') if options['rejects'] else None
+        try:
+            for kind in ['users', 'advertisements']:
+                if options[kind]:
+                    self.import_file(kind, options, rejects)
+        finally:
+            if rejects:
+                rejects.close()
+
+    def import_file(self, kind, options, rejects):
+        path = options[kind]
+
+        def on_reject(line, errors):
+            if rejects:
+                rejects.write(json.dumps({'file': path, 'line': line, 'errors': errors}) + '\n')
+            elif options['verbosity'] > 1:
+                self.stderr.write(f'{path}:{line} {json.dumps(errors)}')
+
+        def on_progress(imported, rejected, rate):
+            if options['verbosity'] > 0:
+                self.stdout.write(f'{kind}: {imported} imported, {rejected} rejected, {rate:.0f} rows/s')
+
+        importer = Importer(options['batch_size'], on_reject, on_progress)
+        try:
+            rows = read_rows(path, options['format'])
+            if kind == 'users':
+                imported, rejected = importer.import_users(rows)
+            else:
+                imported, rejected = importer.import_advertisements(rows, options['status'])
+        except OSError as error:
+            raise CommandError(error)
+
+        self.stdout.write(self.style.SUCCESS(f'Imported {imported} {kind} from {path}, rejected {rejected}'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from advertisement.models import Advertisement
+from advertisement.ratings import rebuild_rating_stats
+from advertisement import caching
+
+
+class Command(BaseCommand):
+    help = 'Recompute review_count, rating_sum and average_rating of advertisements from their reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Advertisements updated per transaction')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id, updated = 0, 0
+
+        # walk the primary key in ranges so each UPDATE only locks one batch of rows
+        while True:
+            ids = list(Advertisement.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                updated += rebuild_rating_stats(Advertisement.objects.filter(pk__gte=ids[0], pk__lte=ids[-1]))
+            last_id = ids[-1]
+
+        caching.bump_version(caching.ADVERTISEMENTS)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating stats for {updated} advertisements'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from advertisement import caching
+from advertisement.counters import find_drift
+from advertisement.models import Category
+
+
+class Command(BaseCommand):
+    help = 'Compare the stored per-category advertisement counters with the advertisements and repair any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report drift, do not repair it')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drift = find_drift()
+            for category, stored, expected in drift:
+                changes = ', '.join(f'{counter} {stored[counter]} -> {expected[counter]}' for counter in stored if stored[counter] != expected[counter])
+                self.stdout.write(f'{category.name} (#{category.pk}): {changes}')
+                if not options['dry_run']:
+                    # set from the counted values, a concurrent change right now is caught by the next run
+                    Category.objects.filter(pk=category.pk).update(updated_at=timezone.now(), **expected)
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Category counters are consistent'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(drift)} categories have drifted counters'))
+        else:
+            caching.bump_version(caching.CATEGORIES)
+            self.stdout.write(self.style.SUCCESS(f'Repaired the counters of {len(drift)} categories'))
@@ -0,0 +1,70 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:17
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('english', coalesce({row}title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({row}location, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce({row}description, '')), 'C')
+"""
+
+FORWARD_SQL = [
+    f"""
+    CREATE OR REPLACE FUNCTION advertisement_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {SEARCH_VECTOR_SQL.format(row='NEW.')};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE TRIGGER advertisement_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, location, description ON advertisement_advertisement
+    FOR EACH ROW EXECUTE FUNCTION advertisement_search_vector_update();
+    """,
+    f"UPDATE advertisement_advertisement SET search_vector = {SEARCH_VECTOR_SQL.format(row='')};",
+    "CREATE INDEX advertisement_search_vector_idx ON advertisement_advertisement USING gin (search_vector);",
+    "CREATE INDEX advertisement_location_trgm_idx ON advertisement_advertisement USING gin (location gin_trgm_ops);",
+]
+
+BACKWARD_SQL = [
+    "DROP INDEX IF EXISTS advertisement_location_trgm_idx;",
+    "DROP INDEX IF EXISTS advertisement_search_vector_idx;",
+    "DROP TRIGGER IF EXISTS advertisement_search_vector_trigger ON advertisement_advertisement;",
+    "DROP FUNCTION IF EXISTS advertisement_search_vector_update();",
+]
+
+
+# the trigger and the gin indexes only exist on PostgreSQL, sqlite keeps the plain column
+def create_search_support(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in FORWARD_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_search_support(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in BACKWARD_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisement', '0004_alter_advertisement_options'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='advertisement',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_support, drop_search_support),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisement', '0005_advertisement_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='advertisement',
+            index=models.Index(fields=['status', 'created_at', 'id'], name='advert_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='advertisement',
+            index=models.Index(fields=['status', 'rental_amount', 'id'], name='advert_status_rent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='advertisement',
+            index=models.Index(fields=['status', 'apartment_size', 'id'], name='advert_status_size_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:19
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+# CREATE INDEX CONCURRENTLY keeps the advertisement table writable while the index builds,
+# sqlite has no such thing and builds it the plain way
+class AddIndexConcurrentlyOnPostgres(AddIndexConcurrently):
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+        return super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+        return super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('advertisement', '0006_listing_sort_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyOnPostgres(
+            model_name='advertisement',
+            index=models.Index(fields=['status', 'category', 'rental_amount'], name='advert_status_category_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='advertisement',
+            index=models.Index(fields=['status', 'bedroom', 'bathroom', 'rental_amount'], name='advert_status_rooms_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='advertisement',
+            index=models.Index(condition=models.Q(('is_rented', False), ('status', 'Approved')), fields=['category', 'rental_amount'], name='advert_open_category_idx'),
+        ),
+        AddIndexConcurrentlyOnPostgres(
+            model_name='advertisement',
+            index=models.Index(condition=models.Q(('is_rented', False), ('status', 'Approved')), fields=['bedroom', 'bathroom', 'rental_amount'], name='advert_open_rooms_idx'),
+        ),
+    ]
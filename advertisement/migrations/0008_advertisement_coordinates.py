@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:20
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisement', '0007_advertisement_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='advertisement',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=9),
+        ),
+        migrations.AddField(
+            model_name='advertisement',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='advertisement',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:23
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Avg, Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_rating_stats(apps, schema_editor):
+    Advertisement = apps.get_model('advertisement', 'Advertisement')
+    Review = apps.get_model('advertisement', 'Review')
+    reviews = Review.objects.filter(advertisement=OuterRef('pk')).order_by().values('advertisement')
+    Advertisement.objects.update(
+        review_count=Coalesce(Subquery(reviews.annotate(total=Count('id')).values('total')), 0),
+        rating_sum=Coalesce(Subquery(reviews.annotate(total=Sum('rating')).values('total')), 0),
+        average_rating=Coalesce(Subquery(reviews.annotate(average=Avg('rating')).values('average')), Value(0.0))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisement', '0009_category_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='advertisement',
+            name='average_rating',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='advertisement',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='advertisement',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='advertisement',
+            index=models.Index(fields=['status', 'average_rating', 'id'], name='advert_status_rating_idx'),
+        ),
+        migrations.RunPython(backfill_rating_stats, migrations.RunPython.noop),
+    ]
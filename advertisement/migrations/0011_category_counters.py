@@ -0,0 +1,48 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:32
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_category_counters(apps, schema_editor):
+    Advertisement = apps.get_model('advertisement', 'Advertisement')
+    Category = apps.get_model('advertisement', 'Category')
+    rows = Advertisement.objects.order_by().values('category').annotate(
+        pending_count=Count('id', filter=Q(status='Pending')),
+        approved_count=Count('id', filter=Q(status='Approved')),
+        rejected_count=Count('id', filter=Q(status='Rejected')),
+        rented_count=Count('id', filter=Q(is_rented=True)),
+    )
+    for row in rows:
+        Category.objects.filter(pk=row.pop('category')).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisement', '0010_advertisement_rating_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='approved_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='pending_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='rejected_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='rented_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_category_counters, migrations.RunPython.noop),
+    ]
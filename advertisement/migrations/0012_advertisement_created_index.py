@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisement', '0011_category_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='advertisement',
+            index=models.Index(fields=['created_at'], name='advert_created_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisement', '0012_advertisement_created_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='advertisement',
+            index=models.Index(fields=['status', 'updated_at'], name='advert_status_updated_idx'),
+        ),
+    ]
@@ -2,15 +2,29 @@ from django.db import models
 from users.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from cloudinary.models import CloudinaryField
+from django.contrib.postgres.search import SearchVectorField
+from advertisement import geo
 
 class Category(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # maintained by advertisement.counters, `manage.py reconcile_category_counters` repairs drift
+    pending_count = models.PositiveIntegerField(default=0, editable=False)
+    approved_count = models.PositiveIntegerField(default=0, editable=False)
+    rejected_count = models.PositiveIntegerField(default=0, editable=False)
+    rented_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.name
     
 
+class AdvertisementManager(models.Manager):
+    def get_queryset(self):
+        # the search vector is only read inside SQL (advertisement.search), loading it with every row is wasted transfer
+        return super().get_queryset().defer('search_vector')
+
+
 class Advertisement(models.Model):
     PENDING = 'Pending'
     APPROVED = 'Approved'
@@ -27,19 +41,65 @@ class Advertisement(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
     rental_amount = models.DecimalField(max_digits=12, decimal_places=2)
     location = models.CharField(max_length=500)
+    latitude = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    # derived from latitude/longitude on save, indexed for the radius search prefix lookups
+    geohash = models.CharField(max_length=geo.GEOHASH_PRECISION, blank=True, db_index=True, editable=False)
     bedroom = models.PositiveIntegerField(validators=[MinValueValidator(1)])
     bathroom = models.PositiveIntegerField(validators=[MinValueValidator(1)])
     apartment_size = models.DecimalField(max_digits=8, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_rented = models.BooleanField(default=False)
+    # maintained from the reviews (advertisement.ratings), rebuild with `manage.py rebuild_rating_stats`
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    average_rating = models.FloatField(default=0, editable=False)
+    # filled by a database trigger on PostgreSQL, see migration 0005
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = AdvertisementManager()
 
     class Meta:
         ordering = ['id']
+        # backing indexes for the `sort` orderings of the listing pagination
+        indexes = [
+            models.Index(fields=['status', 'created_at', 'id'], name='advert_status_created_idx'),
+            models.Index(fields=['status', 'rental_amount', 'id'], name='advert_status_rent_idx'),
+            models.Index(fields=['status', 'apartment_size', 'id'], name='advert_status_size_idx'),
+            models.Index(fields=['status', 'average_rating', 'id'], name='advert_status_rating_idx'),
+            # AdvertiseFilter lookups, always combined with the status filter of the listing
+            models.Index(fields=['status', 'category', 'rental_amount'], name='advert_status_category_idx'),
+            models.Index(fields=['status', 'bedroom', 'bathroom', 'rental_amount'], name='advert_status_rooms_idx'),
+            # listings that can still be rented (`?is_rented=false`)
+            models.Index(fields=['category', 'rental_amount'], condition=models.Q(status='Approved', is_rented=False), name='advert_open_category_idx'),
+            models.Index(fields=['bedroom', 'bathroom', 'rental_amount'], condition=models.Q(status='Approved', is_rented=False), name='advert_open_rooms_idx'),
+            # day ranges of the daily statistics rollup
+            models.Index(fields=['created_at'], name='advert_created_idx'),
+            # the Last-Modified aggregate of the listing (advertisement.conditional)
+            models.Index(fields=['status', 'updated_at'], name='advert_status_updated_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # the stored state, the signal handlers compare against it to apply only what changed
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def set_geohash(self):
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geo.encode(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
+
+    def save(self, *args, **kwargs):
+        self.set_geohash()
+        super().save(*args, **kwargs)
+
 
 class AdvertisementImage(models.Model):
     advertisement = models.ForeignKey(Advertisement, on_delete=models.CASCADE, related_name='images')
@@ -54,5 +114,12 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # the stored rating, so an update only moves the advertisement aggregates by the difference
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def __str__(self):
         return f"Review by `{self.user.first_name}` on `{self.advertisement.title}`"
\ No newline at end of file
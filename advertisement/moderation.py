@@ -0,0 +1,47 @@
+from django.db import transaction
+from django.utils import timezone
+from advertisement import caching, counters
+from advertisement.models import Advertisement
+from advertisement.signals import TRACKED_FIELDS
+from advertisement.similarity import similar_listings
+from advertisement.typeahead import typeahead
+from api import statistics
+
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+NOT_FOUND = 'not_found'
+
+
+class TooManyAdvertisements(Exception):
+    pass
+
+
+@transaction.atomic
+def bulk_set_status(queryset, status, ids=None, max_rows=None):
+    # one locking SELECT and one UPDATE for the whole batch; the counters, indexes and caches the
+    # save() signals keep per row are updated once from the rows' previous values
+    rows = queryset.select_for_update().order_by('id').values('id', 'created_at', *TRACKED_FIELDS)
+    # the size limit is checked on the locked rows, at most one more than allowed is locked
+    rows = list(rows[:max_rows + 1] if max_rows is not None else rows)
+    if max_rows is not None and len(rows) > max_rows:
+        raise TooManyAdvertisements(max_rows)
+    changed = [row for row in rows if row['status'] != status]
+    if changed:
+        Advertisement.objects.filter(pk__in=[row['id'] for row in changed]).update(status=status, updated_at=timezone.now())
+
+        transitions = [(row, {**row, 'status': status}) for row in changed]
+        counters_changed = counters.listings_changed(transitions)
+        statistics.listings_changed(transitions)
+        transaction.on_commit(lambda: listings_updated(transitions, counters_changed))
+
+    results = {row['id']: UPDATED if row['status'] != status else UNCHANGED for row in rows}
+    for advertisement_id in ids or []:
+        results.setdefault(advertisement_id, NOT_FOUND)
+    return [{'id': advertisement_id, 'result': result} for advertisement_id, result in results.items()]
+
+
+def listings_updated(transitions, counters_changed):
+    caching.bump_version(caching.ADVERTISEMENTS, caching.FACETS, *([caching.CATEGORIES] if counters_changed else []))
+    for old, new in transitions:
+        typeahead.listing_changed(old, new)
+        similar_listings.listing_changed(old['id'], old, new)
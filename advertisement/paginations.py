@@ -1,4 +1,168 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Field, Func, Value
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, Cursor, CursorPagination, PageNumberPagination
+
 
 class DefaultPagination(PageNumberPagination):
-    page_size = 10
\ No newline at end of file
+    page_size = 10
+
+
+class RowValue(Func):
+    # `(a, b)`, compared as a whole: `(a, b) > (x, y)` is `a > x OR a = x AND b > y`
+    template = '(%(expressions)s)'
+    output_field = Field()
+
+
+class KeysetPagination(CursorPagination):
+    # the cursor holds every ordering column of the row it stops at (the last one is the primary key),
+    # a page is `WHERE (col, id) > (:col, :id)` with no OFFSET, so rows with equal sort values never stall it.
+    # all the columns of an ordering have to sort the same way for the row comparison.
+    page_size = 10
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+        self.columns = [column.lstrip('-') for column in ordering]
+        self.descending = ordering[0].startswith('-')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor and self.parse_position(queryset.model, self.cursor.position)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [column[1:] if column.startswith('-') else f'-{column}' for column in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            # previous pages walk the ordering backwards, from the first row of the page they came from
+            lookup = 'lt' if self.descending != reverse else 'gt'
+            queryset = queryset.alias(keyset=RowValue(*self.columns)).filter(**{f'keyset__{lookup}': RowValue(*position)})
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.first_position = self.get_position(self.page[0]) if self.page else self.cursor and self.cursor.position
+        self.last_position = self.get_position(self.page[-1]) if self.page else self.cursor and self.cursor.position
+        self.display_page_controls = self.has_next or self.has_previous
+        return self.page
+
+    def get_position(self, row):
+        # list pages hand over values() rows, the other views model instances
+        values = [row[column] if isinstance(row, dict) else getattr(row, column) for column in self.columns]
+        return json.dumps([str(value) for value in values])
+
+    def parse_position(self, model, position):
+        if position is None:
+            return None
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(self.columns):
+                raise ValueError
+            fields = [model._meta.get_field(column) for column in self.columns]
+            return [Value(field.to_python(value), output_field=field) for field, value in zip(fields, values)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.last_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.first_position))
+
+
+class ListingPagination(BasePagination):
+    # page numbers (or no pagination at all) stay the default so existing clients keep working,
+    # `?pagination=cursor` switches to keyset pages which never run COUNT(*) or a growing OFFSET
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+    sort_query_param = 'sort'
+    # every ordering ends with the primary key so rows with equal sort values keep a stable order
+    sort_orderings = {
+        'newest': ('-created_at', '-id'),
+    }
+    default_sort = 'newest'
+    page_pagination_class = DefaultPagination
+
+    def get_sort_ordering(self, request):
+        return self.sort_orderings.get(request.query_params.get(self.sort_query_param))
+
+    def is_cursor_mode(self, request):
+        return request.query_params.get(self.mode_query_param) == self.cursor_mode
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = self.get_sort_ordering(request)
+
+        if self.is_cursor_mode(request):
+            self.paginator = KeysetPagination(ordering or self.sort_orderings[self.default_sort])
+            return self.paginator.paginate_queryset(queryset, request, view)
+
+        self.paginator = self.page_pagination_class() if self.page_pagination_class else None
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        if self.paginator is None:
+            return None
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return schema
+
+    def get_schema_operation_parameters(self, view):
+        parameters = [
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Set to `cursor` for keyset pagination.',
+                'schema': {'type': 'string', 'enum': [self.cursor_mode]},
+            },
+            {
+                'name': self.sort_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Sort order of the results.',
+                'schema': {'type': 'string', 'enum': list(self.sort_orderings)},
+            },
+            {
+                'name': KeysetPagination.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value (cursor mode only).',
+                'schema': {'type': 'string'},
+            },
+        ]
+        if self.page_pagination_class:
+            parameters += self.page_pagination_class().get_schema_operation_parameters(view)
+        return parameters
+
+
+class AdvertisementPagination(ListingPagination):
+    sort_orderings = {
+        'newest': ('-created_at', '-id'),
+        'price': ('rental_amount', 'id'),
+        '-price': ('-rental_amount', '-id'),
+        'size': ('apartment_size', 'id'),
+        '-size': ('-apartment_size', '-id'),
+        'rating': ('-average_rating', '-id'),
+    }
+
+
+class UserListingPagination(ListingPagination):
+    # orders and rent requests were never paginated, keep that unless cursor mode is asked for
+    page_pagination_class = None
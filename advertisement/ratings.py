@@ -0,0 +1,28 @@
+from django.db.models import Avg, Count, F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.utils import timezone
+from advertisement.models import Advertisement, Review
+
+
+def apply_rating_change(advertisement_id, count_delta, sum_delta):
+    # single UPDATE with F() expressions, concurrent reviews never overwrite each other
+    Advertisement.objects.filter(pk=advertisement_id).update(
+        review_count=F('review_count') + count_delta,
+        rating_sum=F('rating_sum') + sum_delta,
+        average_rating=Coalesce(
+            Cast(F('rating_sum') + sum_delta, FloatField()) / NullIf(F('review_count') + count_delta, 0),
+            Value(0.0)
+        ),
+        updated_at=timezone.now()
+    )
+
+
+def rebuild_rating_stats(advertisements=None):
+    advertisements = Advertisement.objects.all() if advertisements is None else advertisements
+    reviews = Review.objects.filter(advertisement=OuterRef('pk')).order_by().values('advertisement')
+
+    return advertisements.update(
+        review_count=Coalesce(Subquery(reviews.annotate(total=Count('id')).values('total')), 0),
+        rating_sum=Coalesce(Subquery(reviews.annotate(total=Sum('rating')).values('total')), 0),
+        average_rating=Coalesce(Subquery(reviews.annotate(average=Avg('rating')).values('average')), Value(0.0))
+    )
@@ -0,0 +1,26 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connections
+from django.db.models import F, Q
+from rest_framework.filters import SearchFilter
+
+
+class AdvertisementSearchFilter(SearchFilter):
+    # full text search over the `search_vector` column (kept up to date by a database trigger)
+    # plus trigram matching on location, so misspelled neighbourhood names still match
+    search_config = 'english'
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        # sqlite (local/test runs) has no tsvector or pg_trgm, so keep the plain ILIKE search there
+        if not search_terms or connections[queryset.db].vendor != 'postgresql':
+            return super().filter_queryset(request, queryset, view)
+
+        search_text = ' '.join(search_terms)
+        search_query = SearchQuery(search_text, search_type='websearch', config=self.search_config)
+
+        return queryset.annotate(
+            rank=SearchRank(F('search_vector'), search_query),
+            similarity=TrigramSimilarity('location', search_text)
+        ).filter(
+            Q(search_vector=search_query) | Q(location__trigram_similar=search_text)
+        ).order_by('-rank', '-similarity', 'id')
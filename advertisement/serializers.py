@@ -6,9 +6,19 @@ from rest_framework import serializers
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
-        fields = ['id', 'name', 'description', 'advertise_count']
+        fields = ['id', 'name', 'description', 'advertise_count', 'rented_count', 'pending_count', 'rejected_count']
+        read_only_fields = ['rented_count', 'pending_count', 'rejected_count']
 
-    advertise_count = serializers.IntegerField(read_only=True, help_text='Return the number of house advertisement in each category')
+    advertise_count = serializers.IntegerField(source='approved_count', read_only=True, help_text='Return the number of approved house advertisement in each category')
+
+    def get_fields(self):
+        fields = super().get_fields()
+        user = getattr(self.context.get('request'), 'user', None)
+        if not (user and user.is_staff):
+            # advertisements waiting for or failed moderation are not public
+            fields.pop('pending_count')
+            fields.pop('rejected_count')
+        return fields
 
 class AdvertisementImageSerializer(serializers.ModelSerializer):
     image = serializers.ImageField()
@@ -34,21 +44,53 @@ class SimpleUserSerializer(serializers.ModelSerializer):
         return None
 
 
+# shared instance, building a new SimpleUserSerializer for every nested row costs more than the query
+simple_user_serializer = SimpleUserSerializer()
+
+
 class UpdateAdvertisementSerializer(serializers.ModelSerializer):
     class Meta:
         model = Advertisement
         fields = ['status']
 
+class BulkStatusSerializer(serializers.Serializer):
+    MAX_ADVERTISEMENTS = 1000
+
+    status = serializers.ChoiceField(choices=Advertisement.STATUS_CHOICES)
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False, max_length=MAX_ADVERTISEMENTS)
+    filter = serializers.DictField(required=False, help_text='Advertisement list filters, e.g. {"status": "Pending", "category_id": 2}')
+
+    def validate(self, attrs):
+        if ('ids' in attrs) == ('filter' in attrs):
+            raise serializers.ValidationError('Send either `ids` or `filter`.')
+        return attrs
+
+
+class UserStateQuerySerializer(serializers.Serializer):
+    MAX_ADVERTISEMENTS = 100
+
+    ids = serializers.CharField(help_text='Comma separated advertisement ids, at most 100')
+
+    def validate_ids(self, value):
+        try:
+            ids = list(dict.fromkeys(int(part) for part in value.split(',') if part.strip()))
+        except ValueError:
+            raise serializers.ValidationError('Send the ids as comma separated numbers.')
+        if not ids or len(ids) > self.MAX_ADVERTISEMENTS:
+            raise serializers.ValidationError(f'Send between 1 and {self.MAX_ADVERTISEMENTS} ids.')
+        return ids
+
+
 class AdvertisementSerializer(serializers.ModelSerializer):
     images = AdvertisementImageSerializer(many=True, read_only=True)
     owner = serializers.SerializerMethodField()
     class Meta:
         model = Advertisement
-        fields = ['id', 'title', 'description', 'is_rented', 'category', 'status', 'owner', 'rental_amount', 'location', 'bedroom', 'bathroom', 'apartment_size', 'images', 'created_at']
-        read_only_fields = ['status','is_rented', 'owner', 'created_at']
+        fields = ['id', 'title', 'description', 'is_rented', 'category', 'status', 'owner', 'rental_amount', 'location', 'latitude', 'longitude', 'bedroom', 'bathroom', 'apartment_size', 'images', 'created_at', 'review_count', 'average_rating']
+        read_only_fields = ['status','is_rented', 'owner', 'created_at', 'review_count', 'average_rating']
     
     def get_owner(self, obj):
-        return SimpleUserSerializer(obj.owner).data
+        return simple_user_serializer.to_representation(obj.owner)
 
     def create(self, validated_data):
         user = self.context['user']
@@ -63,4 +105,4 @@ class ReviewSerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'advertisement']
 
     def get_user(self, obj):
-        return SimpleUserSerializer(obj.user).data
\ No newline at end of file
+        return simple_user_serializer.to_representation(obj.user)
\ No newline at end of file
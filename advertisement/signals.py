@@ -0,0 +1,104 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from advertisement.models import Advertisement, AdvertisementImage, Category, Review
+from advertisement import caching, counters
+from advertisement.ratings import apply_rating_change
+from advertisement.similarity import similar_listings
+from advertisement.typeahead import typeahead
+from api import statistics
+from users.models import User
+
+TRACKED_FIELDS = ['status', 'location', 'category_id', 'is_rented', 'rental_amount', 'bedroom', 'bathroom', 'apartment_size']
+
+
+def tracked_values(instance):
+    return {field: getattr(instance, field) for field in TRACKED_FIELDS}
+
+
+def listing_indexes_changed(advertisement_id, old_values, new_values):
+    typeahead.listing_changed(old_values, new_values)
+    similar_listings.listing_changed(advertisement_id, old_values, new_values)
+
+
+@receiver([post_save, post_delete], sender=Advertisement)
+def invalidate_advertisement_caches(sender, **kwargs):
+    caching.bump_version_on_commit(caching.ADVERTISEMENTS, caching.FACETS)
+
+
+@receiver(pre_save, sender=Advertisement)
+def load_stored_values(sender, instance, **kwargs):
+    # instances loaded with only()/defer() miss some of the stored values the handlers below compare against
+    if instance.pk is None:
+        return
+    loaded_values = getattr(instance, '_loaded_values', {})
+    missing = [field for field in TRACKED_FIELDS if field not in loaded_values]
+    if missing:
+        stored = Advertisement.objects.filter(pk=instance.pk).values(*missing).first()
+        instance._loaded_values = {**loaded_values, **(stored or {})}
+
+
+@receiver(post_save, sender=Advertisement)
+def update_listing_indexes(sender, instance, created, **kwargs):
+    old_values = None if created else getattr(instance, '_loaded_values', None)
+    new_values = tracked_values(instance)
+    if counters.listing_changed(old_values, new_values):
+        caching.bump_version_on_commit(caching.CATEGORIES)
+    if old_values and any(old_values[field] != new_values[field] for field in ('status', 'category_id')):
+        statistics.listings_changed([({**old_values, 'created_at': instance.created_at}, {**new_values, 'created_at': instance.created_at})])
+    # the in-process indexes follow committed data only, a rolled back save leaves them as they were
+    advertisement_id = instance.pk
+    transaction.on_commit(lambda: listing_indexes_changed(advertisement_id, old_values, new_values))
+    instance._loaded_values = {**(old_values or {}), **new_values}
+
+
+@receiver(post_delete, sender=Advertisement)
+def remove_from_listing_indexes(sender, instance, **kwargs):
+    old_values = tracked_values(instance)
+    if counters.listing_changed(old=old_values):
+        caching.bump_version_on_commit(caching.CATEGORIES)
+    statistics.listings_changed([({**old_values, 'created_at': instance.created_at}, None)])
+    # the collector clears instance.pk before the commit
+    advertisement_id = instance.pk
+    transaction.on_commit(lambda: listing_indexes_changed(advertisement_id, old_values, None))
+
+
+@receiver([post_save, post_delete], sender=AdvertisementImage)
+def touch_advertisement_on_image_change(sender, instance, **kwargs):
+    # images are part of the advertisement payload, keep its Last-Modified/ETag moving with them
+    Advertisement.objects.filter(pk=instance.advertisement_id).update(updated_at=timezone.now())
+    caching.bump_version_on_commit(caching.ADVERTISEMENTS)
+
+
+@receiver(post_save, sender=Review)
+def add_review_rating(sender, instance, created, **kwargs):
+    if created:
+        apply_rating_change(instance.advertisement_id, 1, instance.rating)
+    else:
+        loaded_rating = getattr(instance, '_loaded_values', {}).get('rating', instance.rating)
+        if loaded_rating != instance.rating:
+            apply_rating_change(instance.advertisement_id, 0, instance.rating - loaded_rating)
+    instance._loaded_values = {**getattr(instance, '_loaded_values', {}), 'rating': instance.rating}
+    caching.bump_version_on_commit(caching.ADVERTISEMENTS)
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_rating(sender, instance, **kwargs):
+    apply_rating_change(instance.advertisement_id, -1, -instance.rating)
+    caching.bump_version_on_commit(caching.ADVERTISEMENTS)
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_caches(sender, **kwargs):
+    caching.bump_version_on_commit(caching.CATEGORIES, caching.FACETS)
+    transaction.on_commit(typeahead.invalidate)
+    transaction.on_commit(similar_listings.invalidate)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_profile_caches(sender, instance, created, update_fields=None, **kwargs):
+    # owners and review authors are embedded in the advertisement and review payloads
+    if created or (update_fields and set(update_fields) <= {'last_login', 'password'}):
+        return
+    caching.bump_version_on_commit(caching.ADVERTISEMENTS, caching.USERS)
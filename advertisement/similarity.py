@@ -0,0 +1,92 @@
+import heapq
+import math
+import threading
+import time
+from django.conf import settings
+from advertisement.models import Advertisement
+
+FEATURES = ['rental_amount', 'bedroom', 'bathroom', 'apartment_size']
+# rent and size are compared on a log scale so a difference counts relative to the listing,
+# room counts as they are; the weights decide how much each feature matters
+WEIGHTS = (4.0, 1.0, 1.0, 2.0)
+
+
+def feature_vector(values):
+    rent, bedroom, bathroom, size = (float(values[name] or 0) for name in FEATURES)
+    return tuple(weight * value for weight, value in zip(WEIGHTS, (math.log1p(rent), bedroom, bathroom, math.log1p(size))))
+
+
+def is_open(values):
+    return values.get('status') == Advertisement.APPROVED and not values.get('is_rented')
+
+
+class CategoryVectors:
+    # one feature vector per approved, not rented listing of a category, keyed by advertisement id.
+    # plain Python, numpy alone is bigger than the deployed lambda may be
+    def __init__(self, ids, vectors):
+        self.vectors = dict(zip(ids, vectors))
+
+    def add(self, advertisement_id, vector):
+        self.vectors[advertisement_id] = vector
+
+    def remove(self, advertisement_id):
+        self.vectors.pop(advertisement_id, None)
+
+    def nearest(self, vector, k, exclude=None):
+        if k <= 0:
+            return []
+        distances = (
+            (math.dist(vector, other), advertisement_id)
+            for advertisement_id, other in self.vectors.items() if advertisement_id != exclude
+        )
+        # a heap of k keeps this linear in the number of listings, equal distances go by id
+        return [advertisement_id for distance, advertisement_id in heapq.nsmallest(k, distances)]
+
+
+class SimilarListings:
+    # per category feature vectors, loaded on the first lookup of a category and kept current
+    # from the advertisement signals. Other worker processes see a change after SIMILAR_LISTINGS_MAX_AGE.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.matrices = {}
+        self.built_at = {}
+
+    def build(self, category_id):
+        rows = list(
+            Advertisement.objects.filter(category_id=category_id, status=Advertisement.APPROVED, is_rented=False)
+            .order_by().values_list('id', *FEATURES)
+        )
+        ids = [row[0] for row in rows]
+        vectors = [feature_vector(dict(zip(FEATURES, row[1:]))) for row in rows]
+        self.matrices[category_id] = CategoryVectors(ids, vectors)
+        self.built_at[category_id] = time.monotonic()
+
+    def get_matrix(self, category_id):
+        built_at = self.built_at.get(category_id)
+        if built_at is None or time.monotonic() - built_at > settings.SIMILAR_LISTINGS_MAX_AGE:
+            self.build(category_id)
+        return self.matrices[category_id]
+
+    def similar_to(self, advertisement, k=10):
+        vector = feature_vector({name: getattr(advertisement, name) for name in FEATURES})
+        with self.lock:
+            return self.get_matrix(advertisement.category_id).nearest(vector, k, exclude=advertisement.pk)
+
+    def invalidate(self):
+        with self.lock:
+            self.matrices.clear()
+            self.built_at.clear()
+
+    def listing_changed(self, advertisement_id, old=None, new=None):
+        # `old`/`new` hold the tracked advertisement fields before and after the change,
+        # categories nobody asked for yet are left alone and loaded on their first lookup
+        with self.lock:
+            if old is not None:
+                # `old` may miss fields of a partially loaded instance, a removal is cheap in every matrix
+                for matrix in self.matrices.values():
+                    matrix.remove(advertisement_id)
+            if new and is_open(new) and new['category_id'] in self.matrices:
+                self.matrices[new['category_id']].add(advertisement_id, feature_vector(new))
+
+
+similar_listings = SimilarListings()
@@ -1,3 +1,554 @@
+import re
+from decimal import Decimal
+from unittest import mock, skipUnless
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from rest_framework.test import APIClient
+from advertisement import counters, serializers
+from advertisement.filter import AdvertiseFilter
+from advertisement.imports import Importer
+from advertisement.models import Advertisement, Category, Review
+from advertisement.paginations import AdvertisementPagination, KeysetPagination
+from advertisement.similarity import similar_listings
+from advertisement.typeahead import typeahead
+from bookings.models import Favourite, Order, RentRequest
+from users.models import User
 
-# Create your tests here.
+# the indexes a plan reads, by name
+INDEX_SCAN = re.compile(r'Index (?:Only )?Scan (?:Backward )?(?:using|on) (\w+)')
+
+
+def create_advertisement(owner, category, **fields):
+    fields = {
+        'title': 'Flat', 'description': '-', 'status': Advertisement.APPROVED, 'rental_amount': Decimal('1000'),
+        'location': 'Dhanmondi', 'bedroom': 1, 'bathroom': 1, 'apartment_size': Decimal('100'), **fields
+    }
+    return Advertisement.objects.create(owner=owner, category=category, **fields)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'query plans are checked against PostgreSQL')
+class ListingQueryPlanTests(TestCase):
+    # enough rows with statistics for the planner to tell the indexes apart, on an empty table any index costs the same
+    rows = 3000
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner@example.com')
+        categories = [Category.objects.create(name=f'Category {number}') for number in range(10)]
+        statuses = [Advertisement.APPROVED, Advertisement.PENDING, Advertisement.REJECTED, Advertisement.PENDING]
+        Advertisement.objects.bulk_create([
+            Advertisement(
+                title='Flat', description='-', owner=owner, category=categories[number % 10], status=statuses[number % 4],
+                is_rented=number % 5 == 0, rental_amount=Decimal(1000 + number * 7919 % 49000), location='Dhanmondi',
+                bedroom=number % 5 + 1, bathroom=number % 3 + 1, apartment_size=Decimal(300 + number * 104729 % 2700)
+            )
+            for number in range(cls.rows)
+        ])
+        cls.category_id = str(categories[3].pk)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE advertisement_advertisement')
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        self.public = Advertisement.objects.filter(status=Advertisement.APPROVED)
+
+    def assertUsesIndex(self, queryset, *names):
+        plan = queryset.explain()
+        self.assertTrue(set(INDEX_SCAN.findall(plan)) & set(names), plan)
+
+    def test_filters(self):
+        filters = {
+            'category': ({'category_id': self.category_id}, 'advert_status_category_idx'),
+            'category + price range': ({'category_id': self.category_id, 'rental_amount__gt': '5000', 'rental_amount__lt': '20000'}, 'advert_status_category_idx'),
+            'price range': ({'rental_amount__gt': '5000', 'rental_amount__lt': '20000'}, 'advert_status_rent_idx'),
+            'rooms': ({'bedroom': '2', 'bathroom': '1'}, 'advert_status_rooms_idx'),
+            'open listings by category': ({'category_id': self.category_id, 'is_rented': 'false'}, 'advert_open_category_idx'),
+            'open listings by rooms': ({'bedroom': '2', 'bathroom': '1', 'is_rented': 'false'}, 'advert_open_rooms_idx'),
+        }
+        for name, (data, index) in filters.items():
+            with self.subTest(name):
+                self.assertUsesIndex(AdvertiseFilter(data, queryset=self.public).qs, index)
+
+    def test_sort_orderings(self):
+        indexes = {
+            # the plain created_at index of the statistics serves the newest first listing as well
+            'newest': ('advert_status_created_idx', 'advert_created_idx'),
+            'price': ('advert_status_rent_idx',),
+            '-price': ('advert_status_rent_idx',),
+            'size': ('advert_status_size_idx',),
+            '-size': ('advert_status_size_idx',),
+            'rating': ('advert_status_rating_idx',),
+        }
+        for sort, ordering in AdvertisementPagination.sort_orderings.items():
+            with self.subTest(sort):
+                self.assertUsesIndex(self.public.order_by(*ordering)[:KeysetPagination.page_size + 1], *indexes[sort])
+
+
+@mock.patch.object(KeysetPagination, 'page_size', 100)
+class KeysetPaginationTests(TestCase):
+    # more equal sort values than DRF's cursor offset cutoff (1000) could ever step over
+    tied = 1250
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner@example.com')
+        category = Category.objects.create(name='Flat')
+        Advertisement.objects.bulk_create([
+            Advertisement(
+                title='Flat', description='-', owner=owner, category=category, status=Advertisement.APPROVED,
+                rental_amount=Decimal('5000'), location='Dhanmondi', bedroom=1, bathroom=1, apartment_size=Decimal('100')
+            )
+            for _ in range(cls.tied)
+        ])
+        cls.ids = set(Advertisement.objects.values_list('id', flat=True))
+
+    def walk(self, url, link):
+        client = APIClient()
+        pages = []
+        while url:
+            self.assertLessEqual(len(pages), self.tied // KeysetPagination.page_size, 'the cursor walk does not end')
+            data = client.get(url).json()
+            pages.append([advertisement['id'] for advertisement in data['results']])
+            url = data[link]
+        return pages, data
+
+    def assertWalksToTheEnd(self, sort):
+        pages, last_page = self.walk(f'/api/v1/advertisements/?pagination=cursor&sort={sort}', 'next')
+        ids = [pk for page in pages for pk in page]
+        self.assertEqual(len(ids), self.tied)
+        self.assertEqual(set(ids), self.ids)
+
+        # and back again from the last page
+        pages, _ = self.walk(last_page['previous'], 'previous')
+        self.assertEqual([pk for page in reversed(pages) for pk in page], ids[:-len(last_page['results'])])
+
+    def test_tied_prices_are_walked_to_the_end(self):
+        for sort in ('price', '-price', 'size', '-size'):
+            with self.subTest(sort):
+                self.assertWalksToTheEnd(sort)
+
+    def test_unrated_listings_are_walked_to_the_end(self):
+        # every listing without reviews has average_rating 0
+        self.assertWalksToTheEnd('rating')
+
+    def test_invalid_cursor_is_not_found(self):
+        response = APIClient().get('/api/v1/advertisements/?pagination=cursor&cursor=invalid')
+        self.assertEqual(response.status_code, 404)
+
+
+class SimilarListingsTests(TestCase):
+    def setUp(self):
+        # the index lives in the process, start every test from the database
+        similar_listings.invalidate()
+        owner = User.objects.create_user('owner@example.com')
+        category = Category.objects.create(name='Flat')
+        self.advertisement = create_advertisement(owner, category)
+        self.others = [create_advertisement(owner, category, rental_amount=Decimal(1000 + 100 * number)) for number in range(1, 4)]
+
+    def similar(self):
+        response = APIClient().get(f'/api/v1/advertisements/{self.advertisement.pk}/similar/')
+        return [advertisement['id'] for advertisement in response.json()]
+
+    def test_closest_rent_first(self):
+        self.assertEqual(self.similar(), [other.pk for other in self.others])
+
+    def test_rented_listings_left_in_a_stale_index_are_not_returned(self):
+        self.similar()
+        # a queryset update sends no signals, like a change made by another worker
+        Advertisement.objects.filter(pk=self.others[0].pk).update(is_rented=True)
+        self.assertEqual(self.similar(), [other.pk for other in self.others[1:]])
+
+
+class ListingImportTests(TestCase):
+    def setUp(self):
+        typeahead.invalidate()
+        similar_listings.invalidate()
+        owner = User.objects.create_user('owner@example.com')
+        self.category = Category.objects.create(name='Flat')
+        self.advertisement = create_advertisement(owner, self.category)
+
+    def import_advertisements(self, status):
+        row = {
+            'title': 'Flat', 'description': '-', 'category': self.category.pk, 'owner_email': 'Owner@Example.com',
+            'rental_amount': '1100', 'location': 'Gulshan', 'bedroom': 1, 'bathroom': 1, 'apartment_size': '100'
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(Importer().import_advertisements([(1, row)], status), (1, 0))
+        return Advertisement.objects.get(location='Gulshan')
+
+    def test_imported_approved_listings_are_suggested_and_similar(self):
+        # both indexes are loaded before the import
+        self.assertEqual(typeahead.suggest('gul'), [])
+        self.assertEqual(similar_listings.similar_to(self.advertisement), [])
+
+        imported = self.import_advertisements(Advertisement.APPROVED)
+        self.assertEqual([suggestion['text'] for suggestion in typeahead.suggest('gul')], ['Gulshan'])
+        self.assertEqual(similar_listings.similar_to(self.advertisement), [imported.pk])
+
+    def test_imported_pending_listings_stay_out(self):
+        self.import_advertisements(Advertisement.PENDING)
+        self.assertEqual(typeahead.suggest('gul'), [])
+        self.assertEqual(similar_listings.similar_to(self.advertisement), [])
+
+
+class RadiusSearchTests(TestCase):
+    point = (23.7465, 90.3760)
+
+    def setUp(self):
+        # responses are cached per query string, a previous test may have cached the same one
+        cache.clear()
+        owner = User.objects.create_user('owner@example.com')
+        category = Category.objects.create(name='Flat')
+        latitude, longitude = self.point
+        self.here = create_advertisement(owner, category, latitude=latitude, longitude=longitude)
+        # about 1.1 and 11 km north
+        self.near = create_advertisement(owner, category, latitude=latitude + 0.01, longitude=longitude)
+        self.far = create_advertisement(owner, category, latitude=latitude + 0.1, longitude=longitude)
+        create_advertisement(owner, category)
+
+    def search(self, near='23.7465,90.3760', **params):
+        return APIClient().get('/api/v1/advertisements/', {'near': near, **params})
+
+    def found(self, **params):
+        response = self.search(**params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [advertisement['id'] for advertisement in response.data['results']]
+
+    def test_default_radius_sorted_by_distance(self):
+        self.assertEqual(self.found(), [self.here.pk, self.near.pk])
+
+    def test_radius(self):
+        self.assertEqual(self.found(radius=20), [self.here.pk, self.near.pk, self.far.pk])
+        self.assertEqual(self.found(radius=0), [self.here.pk])
+
+    def test_invalid_parameters_are_refused(self):
+        for params in [{'radius': -1}, {'radius': 501}, {'near': '23.7'}, {'near': '91,0'}, {'pagination': 'cursor'}]:
+            with self.subTest(params):
+                self.assertEqual(self.search(**params).status_code, 400)
+
+    def test_search_across_the_pole(self):
+        polar = create_advertisement(self.here.owner, self.here.category, latitude=89.99, longitude=10)
+        # the other side of the pole, about 2.2 km away
+        self.assertEqual(self.found(near='89.99,-170', radius=50), [polar.pk])
+
+
+class FacetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner@example.com')
+        self.flat, self.house = Category.objects.create(name='Flat'), Category.objects.create(name='House')
+        create_advertisement(self.owner, self.flat, bedroom=2, rental_amount=Decimal('4000'))
+        create_advertisement(self.owner, self.flat, bedroom=3, rental_amount=Decimal('12000'))
+        create_advertisement(self.owner, self.house, bedroom=2, rental_amount=Decimal('60000'))
+        create_advertisement(self.owner, self.house, status=Advertisement.PENDING)
+
+    def facets(self, **params):
+        response = APIClient().get('/api/v1/advertisements/facets/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_counts_of_approved_advertisements(self):
+        facets = self.facets()
+        self.assertEqual(facets['total'], 3)
+        self.assertEqual(
+            facets['categories'],
+            [{'id': self.flat.pk, 'name': 'Flat', 'count': 2}, {'id': self.house.pk, 'name': 'House', 'count': 1}]
+        )
+        self.assertEqual(facets['bedroom'], [{'value': 2, 'count': 2}, {'value': 3, 'count': 1}])
+        self.assertEqual([bucket['count'] for bucket in facets['rental_amount']], [1, 0, 1, 0, 1])
+        self.assertEqual(facets['rental_amount'][-1], {'min': 50000, 'max': None, 'count': 1})
+
+    def test_counts_follow_the_filters(self):
+        facets = self.facets(bedroom=2)
+        self.assertEqual(facets['total'], 2)
+        self.assertEqual(facets['bedroom'], [{'value': 2, 'count': 2}])
+
+    def test_cached_counts_change_after_a_commit(self):
+        self.assertEqual(self.facets()['total'], 3)
+        with self.captureOnCommitCallbacks() as callbacks:
+            create_advertisement(self.owner, self.flat)
+        # not committed yet, the cached counts are still served
+        self.assertEqual(self.facets()['total'], 3)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.facets()['total'], 4)
+
+
+class CachedReadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner@example.com')
+        self.staff = User.objects.create_user('staff@example.com', is_staff=True)
+        self.category = Category.objects.create(name='Flat')
+        self.advertisement = create_advertisement(self.owner, self.category)
+        self.pending = create_advertisement(self.owner, self.category, status=Advertisement.PENDING)
+
+    def get(self, url, user=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def titles(self, response):
+        return [advertisement['title'] for advertisement in response.data['results']]
+
+    def test_repeated_reads_are_served_from_the_cache(self):
+        self.assertEqual(self.get('/api/v1/advertisements/')['X-Cache'], 'MISS')
+        self.assertEqual(self.get('/api/v1/advertisements/')['X-Cache'], 'HIT')
+        self.assertEqual(self.get('/api/v1/advertisements/?bedroom=1')['X-Cache'], 'MISS')
+        self.assertEqual(self.get(f'/api/v1/advertisements/{self.advertisement.pk}/')['X-Cache'], 'MISS')
+        self.assertEqual(self.get(f'/api/v1/advertisements/{self.advertisement.pk}/')['X-Cache'], 'HIT')
+
+    def test_staff_and_public_reads_are_cached_apart(self):
+        self.assertEqual(len(self.get('/api/v1/advertisements/').data['results']), 1)
+        self.assertEqual(len(self.get('/api/v1/advertisements/', self.staff).data['results']), 2)
+        self.assertEqual(len(self.get('/api/v1/advertisements/').data['results']), 1)
+
+    def test_a_committed_edit_replaces_the_cached_read(self):
+        self.get('/api/v1/advertisements/')
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.advertisement.title = 'Renovated flat'
+            self.advertisement.save()
+        # not committed yet, the cached payload is still served
+        self.assertEqual(self.titles(self.get('/api/v1/advertisements/')), ['Flat'])
+        for callback in callbacks:
+            callback()
+        response = self.get('/api/v1/advertisements/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(self.titles(response), ['Renovated flat'])
+
+    def test_a_committed_category_change_replaces_the_cached_categories(self):
+        self.get('/api/v1/categories/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='House')
+        response = self.get('/api/v1/categories/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(sorted(category['name'] for category in response.data), ['Flat', 'House'])
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner@example.com', first_name='Owner')
+        self.advertisement = create_advertisement(self.owner, Category.objects.create(name='Flat'))
+        self.url = '/api/v1/advertisements/'
+
+    def get(self, url=None, **headers):
+        return APIClient().get(url or self.url, headers=headers)
+
+    def test_unchanged_list_is_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        response = self.get(if_none_match=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_unchanged_advertisement_is_not_modified_since(self):
+        url = f'{self.url}{self.advertisement.pk}/'
+        response = self.get(url)
+        self.assertEqual(self.get(url, if_modified_since=response['Last-Modified']).status_code, 304)
+
+    def test_committed_edit_is_sent_again(self):
+        etag = self.get()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.advertisement.title = 'Renovated flat'
+            self.advertisement.save()
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results'][0]['title'], 'Renovated flat')
+
+    def test_owner_profile_edit_is_sent_again(self):
+        # the owner is embedded in the payload, but the advertisement row does not change
+        etag = self.get()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.owner.first_name = 'Renamed'
+            self.owner.save()
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['owner']['name'], 'Renamed')
+
+    def test_new_review_is_sent_again(self):
+        url = f'{self.url}{self.advertisement.pk}/reviews/'
+        etag = self.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(advertisement=self.advertisement, user=self.owner, rating=4, comment='Nice')
+        self.assertEqual(self.get(url, if_none_match=etag).status_code, 200)
+
+
+class CategoryCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner@example.com')
+        self.flat, self.house = Category.objects.create(name='Flat'), Category.objects.create(name='House')
+        self.advertisement = create_advertisement(self.owner, self.flat, status=Advertisement.PENDING)
+        create_advertisement(self.owner, self.flat)
+
+    def assertCounters(self, category, pending=0, approved=0, rejected=0, rented=0):
+        category.refresh_from_db()
+        self.assertEqual(
+            (category.pending_count, category.approved_count, category.rejected_count, category.rented_count),
+            (pending, approved, rejected, rented)
+        )
+        # whatever the stored counters say, they agree with a full recount
+        self.assertEqual(counters.find_drift(), [])
+
+    def test_created(self):
+        self.assertCounters(self.flat, pending=1, approved=1)
+        self.assertCounters(self.house)
+
+    def test_status_change(self):
+        self.advertisement.status = Advertisement.APPROVED
+        self.advertisement.save()
+        self.assertCounters(self.flat, approved=2)
+
+    def test_category_change(self):
+        self.advertisement.category = self.house
+        self.advertisement.save()
+        self.assertCounters(self.flat, approved=1)
+        self.assertCounters(self.house, pending=1)
+
+    def test_rental(self):
+        self.advertisement.is_rented = True
+        self.advertisement.save(update_fields=['is_rented', 'updated_at'])
+        self.assertCounters(self.flat, pending=1, approved=1, rented=1)
+
+    def test_delete(self):
+        self.advertisement.is_rented = True
+        self.advertisement.save()
+        Advertisement.objects.get(pk=self.advertisement.pk).delete()
+        self.assertCounters(self.flat, approved=1)
+
+    def test_partially_loaded_advertisement(self):
+        # a save of an instance loaded with only() still compares against the stored values
+        advertisement = Advertisement.objects.only('id', 'title').get(pk=self.advertisement.pk)
+        advertisement.status = Advertisement.REJECTED
+        advertisement.save()
+        self.assertCounters(self.flat, approved=1, rejected=1)
+
+    def test_categories_endpoint_counts_after_a_commit(self):
+        APIClient().get('/api/v1/categories/')
+        with self.captureOnCommitCallbacks(execute=True):
+            create_advertisement(self.owner, self.flat)
+        counts = {category['name']: category['advertise_count'] for category in APIClient().get('/api/v1/categories/').data}
+        self.assertEqual(counts, {'Flat': 2, 'House': 0})
+
+
+class BulkStatusTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create_user('owner@example.com')
+        self.flat, self.house = Category.objects.create(name='Flat'), Category.objects.create(name='House')
+        self.pending = [create_advertisement(owner, self.flat, status=Advertisement.PENDING) for _ in range(2)]
+        self.pending_house = create_advertisement(owner, self.house, status=Advertisement.PENDING)
+        self.approved = create_advertisement(owner, self.flat)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('staff@example.com', is_staff=True))
+
+    def bulk_status(self, data):
+        return self.client.post('/api/v1/advertisements/bulk_status/', data, format='json')
+
+    def statuses(self):
+        return dict(Advertisement.objects.values_list('id', 'status'))
+
+    def test_by_ids(self):
+        missing = self.approved.pk + 100
+        response = self.bulk_status({'status': Advertisement.APPROVED, 'ids': [self.pending[0].pk, self.approved.pk, missing]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [
+            {'id': self.pending[0].pk, 'result': 'updated'},
+            {'id': self.approved.pk, 'result': 'unchanged'},
+            {'id': missing, 'result': 'not_found'},
+        ])
+        self.assertEqual(self.statuses()[self.pending[0].pk], Advertisement.APPROVED)
+        self.assertEqual(self.statuses()[self.pending[1].pk], Advertisement.PENDING)
+        self.assertEqual(counters.find_drift(), [])
+
+    def test_by_filter_of_pending_advertisements(self):
+        response = self.bulk_status({'status': Advertisement.REJECTED, 'filter': {'category_id': self.flat.pk}})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(row['id'] for row in response.data), [advertisement.pk for advertisement in self.pending])
+        statuses = self.statuses()
+        self.assertEqual([statuses[advertisement.pk] for advertisement in self.pending], [Advertisement.REJECTED] * 2)
+        self.assertEqual(statuses[self.pending_house.pk], Advertisement.PENDING)
+        self.assertEqual(statuses[self.approved.pk], Advertisement.APPROVED)
+        self.assertEqual(counters.find_drift(), [])
+
+    def test_invalid_requests_are_refused(self):
+        requests = [
+            {'status': Advertisement.APPROVED, 'filter': {'bedroom': 'many'}},
+            {'status': Advertisement.APPROVED, 'filter': {'status': 'Sold'}},
+            {'status': Advertisement.APPROVED, 'ids': [self.approved.pk], 'filter': {}},
+            {'status': Advertisement.APPROVED},
+            {'status': 'Sold', 'ids': [self.approved.pk]},
+        ]
+        for data in requests:
+            with self.subTest(data):
+                self.assertEqual(self.bulk_status(data).status_code, 400)
+        self.assertEqual(Advertisement.objects.filter(status=Advertisement.PENDING).count(), 3)
+
+    @mock.patch.object(serializers.BulkStatusSerializer, 'MAX_ADVERTISEMENTS', 2)
+    def test_too_many_advertisements_are_refused(self):
+        response = self.bulk_status({'status': Advertisement.APPROVED, 'filter': {}})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Advertisement.objects.filter(status=Advertisement.PENDING).count(), 3)
+
+    def test_only_staff(self):
+        self.client.force_authenticate(self.approved.owner)
+        response = self.bulk_status({'status': Advertisement.APPROVED, 'ids': [self.pending[0].pk]})
+        self.assertEqual(response.status_code, 403)
+
+    def test_public_list_after_the_commit(self):
+        self.assertEqual(len(APIClient().get('/api/v1/advertisements/').data['results']), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bulk_status({'status': Advertisement.APPROVED, 'filter': {}})
+        self.assertEqual(len(APIClient().get('/api/v1/advertisements/').data['results']), 4)
+
+
+class UserStateTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user('owner@example.com')
+        category = Category.objects.create(name='Flat')
+        self.saved, self.requested, self.rented, self.untouched = [create_advertisement(owner, category) for _ in range(4)]
+        self.tenant = User.objects.create_user('tenant@example.com')
+        Favourite.objects.create(user=self.tenant, advertisement=self.saved)
+        RentRequest.objects.create(user=self.tenant, advertisement=self.requested, status=RentRequest.APPROVED)
+        Order.objects.create(user=self.tenant, advertisement=self.rented, status=Order.BOOKED, full_name='Tenant', address='Dhaka', phone_number='01700000000')
+        # another tenant's state is not leaked
+        Favourite.objects.create(user=owner, advertisement=self.untouched)
+        self.client = APIClient()
+        self.client.force_authenticate(self.tenant)
+
+    def user_state(self, ids):
+        return self.client.get('/api/v1/advertisements/user_state/', {'ids': ids})
+
+    def test_states_in_the_order_asked(self):
+        ids = [self.untouched.pk, self.rented.pk, self.requested.pk, self.saved.pk]
+        # one query per relation, whatever the number of ids
+        with self.assertNumQueries(3):
+            response = self.user_state(','.join(map(str, ids)))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [
+            {'advertisement_id': self.untouched.pk, 'is_favourite': False, 'rent_request_status': None, 'has_rented': False},
+            {'advertisement_id': self.rented.pk, 'is_favourite': False, 'rent_request_status': None, 'has_rented': True},
+            {'advertisement_id': self.requested.pk, 'is_favourite': False, 'rent_request_status': RentRequest.APPROVED, 'has_rented': False},
+            {'advertisement_id': self.saved.pk, 'is_favourite': True, 'rent_request_status': None, 'has_rented': False},
+        ])
+
+    def test_repeated_ids_once(self):
+        response = self.user_state(f'{self.saved.pk}, {self.saved.pk}')
+        self.assertEqual([state['advertisement_id'] for state in response.data], [self.saved.pk])
+
+    def test_invalid_ids(self):
+        too_many = ','.join(str(number) for number in range(serializers.UserStateQuerySerializer.MAX_ADVERTISEMENTS + 1))
+        for ids in ['', 'one,2', too_many]:
+            with self.subTest(ids=ids[:20]):
+                self.assertEqual(self.user_state(ids).status_code, 400)
+        self.assertEqual(self.client.get('/api/v1/advertisements/user_state/').status_code, 400)
+
+    def test_login_required(self):
+        self.assertEqual(APIClient().get('/api/v1/advertisements/user_state/', {'ids': self.saved.pk}).status_code, 401)
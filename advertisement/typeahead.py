@@ -0,0 +1,128 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+from django.conf import settings
+from django.db.models import Count
+from advertisement.models import Advertisement, Category
+
+LOCATION = 'location'
+CATEGORY = 'category'
+
+
+def normalize(text):
+    return ' '.join(str(text).lower().split())
+
+
+def location_terms(location):
+    # "House 7, Road 12, Dhanmondi, Dhaka" -> each comma separated part is a suggestion of its own
+    return {normalize(part): part.strip() for part in (location or '').split(',') if part.strip()}
+
+
+class PrefixIndex:
+    # sorted terms for bisect prefix lookups plus a listing count per term
+    def __init__(self):
+        self.terms = []
+        self.counts = {}
+        self.labels = {}
+
+    def add(self, term, label, amount=1):
+        if term not in self.counts:
+            insort(self.terms, term)
+            self.counts[term] = 0
+        self.counts[term] += amount
+        self.labels.setdefault(term, label)
+
+    def remove(self, term, amount=1):
+        if term not in self.counts:
+            return
+        self.counts[term] -= amount
+        if self.counts[term] <= 0:
+            del self.terms[bisect_left(self.terms, term)]
+            del self.counts[term]
+            del self.labels[term]
+
+    def search(self, prefix, limit):
+        start = bisect_left(self.terms, prefix)
+        end = bisect_left(self.terms, prefix + '\uffff', lo=start)
+        matches = self.terms[start:end]
+        return [(self.labels[term], self.counts[term]) for term in heapq.nlargest(limit, matches, key=self.counts.__getitem__)]
+
+
+class Typeahead:
+    # built lazily on the first lookup, then kept current from the advertisement signals.
+    # Other worker processes only see a change after their own rebuild (TYPEAHEAD_MAX_AGE).
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.locations = None
+        self.categories = None
+        self.category_names = {}
+        self.built_at = 0
+
+    def is_stale(self):
+        return self.locations is None or time.monotonic() - self.built_at > settings.TYPEAHEAD_MAX_AGE
+
+    def build(self):
+        locations, categories = PrefixIndex(), PrefixIndex()
+        approved = Advertisement.objects.filter(status=Advertisement.APPROVED).order_by()
+
+        location_counts = approved.values('location').annotate(total=Count('id'))
+        for row in location_counts.iterator():
+            for term, label in location_terms(row['location']).items():
+                locations.add(term, label, row['total'])
+
+        category_names = dict(Category.objects.values_list('id', 'name'))
+        for row in approved.values('category_id').annotate(total=Count('id')):
+            name = category_names.get(row['category_id'])
+            if name:
+                categories.add(normalize(name), name, row['total'])
+
+        self.locations, self.categories, self.category_names = locations, categories, category_names
+        self.built_at = time.monotonic()
+
+    def invalidate(self):
+        with self.lock:
+            self.locations = None
+
+    def suggest(self, query, limit=10):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        with self.lock:
+            if self.is_stale():
+                self.build()
+            suggestions = [
+                {'text': label, 'type': kind, 'count': count}
+                for kind, index in ((LOCATION, self.locations), (CATEGORY, self.categories))
+                for label, count in index.search(prefix, limit)
+            ]
+        return sorted(suggestions, key=lambda suggestion: -suggestion['count'])[:limit]
+
+    def apply(self, values, amount):
+        for term, label in location_terms(values.get('location')).items():
+            if amount > 0:
+                self.locations.add(term, label, amount)
+            else:
+                self.locations.remove(term, -amount)
+
+        name = self.category_names.get(values.get('category_id'))
+        if name is None:
+            # a category this index has never seen, pick it up on the next lookup
+            self.locations = None
+        elif amount > 0:
+            self.categories.add(normalize(name), name, amount)
+        else:
+            self.categories.remove(normalize(name), -amount)
+
+    def listing_changed(self, old=None, new=None):
+        # `old`/`new` hold status, location and category_id of the advertisement before and after the change
+        with self.lock:
+            if self.locations is None:
+                return
+            if old and old.get('status') == Advertisement.APPROVED:
+                self.apply(old, -1)
+            if new and new.get('status') == Advertisement.APPROVED and self.locations is not None:
+                self.apply(new, 1)
+
+
+typeahead = Typeahead()
@@ -1,24 +1,39 @@
 from django.shortcuts import render
 from rest_framework import viewsets
-from rest_framework.permissions import IsAdminUser, IsAuthenticatedOrReadOnly
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly
 from api.permissions import IsAdminOrReadOnly, IsAdvertisementOwnerOrReadOnly
 from advertisement.models import Advertisement, Category, AdvertisementImage, Review
 from advertisement import serializers, paginations
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter
+from advertisement.search import AdvertisementSearchFilter
 from advertisement.permissions import IsReviewAuthorOrReadOnly
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from drf_yasg.utils import swagger_auto_schema
-from advertisement.filter import AdvertiseFilter
-from django.db.models import Count
+from advertisement.filter import AdvertiseFilter, ModerationFilter
+from advertisement.moderation import bulk_set_status, TooManyAdvertisements
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from advertisement import caching
+from advertisement.facets import compute_facets
+from advertisement.conditional import ConditionalGetMixin
+from advertisement.fast_serializers import FastListMixin
+from api.fieldsets import SparseFieldsetMixin
+from advertisement.typeahead import typeahead
+from advertisement.similarity import similar_listings
+from bookings.user_state import get_user_states
+from django.db import transaction
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ConditionalGetMixin, caching.CachedReadMixin, viewsets.ModelViewSet):
     http_method_names = ['get', 'post', 'delete', 'put', 'options']
 
-    queryset = Category.objects.annotate(advertise_count=Count('advertisements')).all()
+    # the counters move `updated_at` too, so the default ETag/Last-Modified validators cover them
+    queryset = Category.objects.all()
     serializer_class = serializers.CategorySerializer
     permission_classes = [IsAdminOrReadOnly]
+    cache_namespace = caching.CATEGORIES
 
     @swagger_auto_schema(
         operation_summary='Get a list of category',
@@ -56,13 +71,15 @@ class CategoryViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class AdvertisementViewSet(viewsets.ModelViewSet):
+class AdvertisementViewSet(ConditionalGetMixin, caching.CachedReadMixin, FastListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     http_method_names = ['get', 'post', 'delete', 'patch', 'options']
     
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filter_backends = [DjangoFilterBackend, AdvertisementSearchFilter]
     filterset_class = AdvertiseFilter
-    search_fields = ['title', 'location']
-    pagination_class = paginations.DefaultPagination
+    search_fields = ['title', 'description', 'location']
+    pagination_class = paginations.AdvertisementPagination
+    cache_namespace = caching.ADVERTISEMENTS
+    sparse_field_relations = {'owner': 'owner'}
 
     def get_queryset(self):
         if self.request.user.is_staff:
@@ -70,8 +87,10 @@ class AdvertisementViewSet(viewsets.ModelViewSet):
         return Advertisement.objects.select_related('owner').prefetch_related('images').filter(status='Approved').all()
     
     def get_permissions(self):
-        if self.action in ['partial_update', 'destroy']:
+        if self.action in ['partial_update', 'destroy', 'bulk_status']:
             return [IsAdminUser()]
+        if self.action == 'user_state':
+            return [IsAuthenticated()]
         return [IsAuthenticatedOrReadOnly()]
     
     def get_serializer_class(self):
@@ -116,6 +135,83 @@ class AdvertisementViewSet(viewsets.ModelViewSet):
     )
     def destroy(self, request, *args, **kwargs):
         return super().destroy(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_summary='Get filter sidebar counts for advertisements',
+        operation_description='Any user can get the number of advertisements per category, bedroom, bathroom and price range for the same filter and search parameters as the advertisement list'
+    )
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        cache_key = caching.make_key(caching.FACETS, request)
+        data = cache.get(cache_key)
+        if data is None:
+            data = compute_facets(self.filter_queryset(self.get_queryset()))
+            cache.set(cache_key, data, settings.FACETS_CACHE_TIMEOUT)
+        return Response(data)
+
+    @swagger_auto_schema(
+        operation_summary='Get location and category suggestions for the search box',
+        operation_description='Any user can get up to `limit` (default 10) location and category names starting with `q`, ranked by the number of approved advertisements'
+    )
+    @action(detail=False, methods=['get'])
+    def suggestions(self, request):
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 10)), 20))
+        except ValueError:
+            limit = 10
+        return Response(typeahead.suggest(request.query_params.get('q', ''), limit))
+
+    @swagger_auto_schema(
+        operation_summary='Approve or reject many advertisements at once by Admin',
+        operation_description='Only Admin can set the status of up to 1000 advertisements, given as a list of `ids` or as a `filter` with the advertisement list filters (pending only unless `status` is given). Returns the result for every advertisement',
+        request_body=serializers.BulkStatusSerializer
+    )
+    @action(detail=False, methods=['post'])
+    def bulk_status(self, request):
+        serializer = serializers.BulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        if 'ids' in data:
+            queryset = Advertisement.objects.filter(pk__in=data['ids'])
+        else:
+            filterset = ModerationFilter(data=data['filter'], queryset=Advertisement.objects.all())
+            if not filterset.is_valid():
+                raise ValidationError({'filter': filterset.errors})
+            queryset = filterset.qs
+
+        try:
+            return Response(bulk_set_status(queryset, data['status'], data.get('ids'), max_rows=serializer.MAX_ADVERTISEMENTS))
+        except TooManyAdvertisements:
+            raise ValidationError({'filter': f'Matches more than {serializer.MAX_ADVERTISEMENTS} advertisements, narrow it down.'})
+
+    @swagger_auto_schema(
+        operation_summary='Get favourite, rent request and rented state of many advertisements for authenticated user',
+        operation_description='Authenticated user can get, for each of up to 100 advertisement `ids`, whether they saved it as favourite, the status of their rent request and whether they rented it',
+        query_serializer=serializers.UserStateQuerySerializer
+    )
+    @action(detail=False, methods=['get'])
+    def user_state(self, request):
+        serializer = serializers.UserStateQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(get_user_states(request.user, serializer.validated_data['ids']))
+
+    @swagger_auto_schema(
+        operation_summary='Get listings similar to a specific advertisement',
+        operation_description='Any user can get up to `limit` (default 10) approved and not rented advertisements of the same category with the closest rent, bedrooms, bathrooms and size'
+    )
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        advertisement = self.get_object()
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 10)), 50))
+        except ValueError:
+            limit = 10
+        ids = similar_listings.similar_to(advertisement, limit)
+        # the index is per worker and may be behind, so what it returns is checked again here
+        listings = {listing.pk: listing for listing in self.get_queryset().filter(pk__in=ids, status=Advertisement.APPROVED, is_rented=False)}
+        serializer = serializers.AdvertisementSerializer([listings[pk] for pk in ids if pk in listings], many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
     
 
 class AdvertisementImageViewSet(viewsets.ModelViewSet):
@@ -163,18 +259,29 @@ class AdvertisementImageViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     http_method_names = ['get', 'post', 'put', 'delete', 'options']
 
     serializer_class = serializers.ReviewSerializer
     permission_classes = [IsReviewAuthorOrReadOnly]
+    validator_namespaces = [caching.USERS]
 
     def get_queryset(self):
         return Review.objects.select_related('user').filter(advertisement_id=self.kwargs.get('advertisement_pk'))
 
+    # the rating aggregates on the advertisement are updated in the same transaction (advertisement.signals)
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(user=self.request.user, advertisement_id=self.kwargs.get('advertisement_pk'))
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+
     @swagger_auto_schema(
         operation_summary='Get a list of reviews for an advertisement',
         operation_description='Any user can get or see all the available reviews for an advertisements'
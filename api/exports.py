@@ -0,0 +1,73 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from advertisement.models import Advertisement
+from bookings.models import Order, RentRequest
+
+CHUNK_SIZE = 2000
+CSV = 'csv'
+NDJSON = 'ndjson'
+CONTENT_TYPES = {
+    CSV: 'text/csv',
+    NDJSON: 'application/x-ndjson',
+}
+
+# dataset -> (queryset, columns as (header, values() lookup)), every queryset is ordered by an index
+# so the database streams rows in index order instead of sorting the whole table first
+DATASETS = {
+    'advertisements': (
+        lambda: Advertisement.objects.order_by('id'),
+        [
+            ('id', 'id'), ('title', 'title'), ('category', 'category__name'), ('status', 'status'),
+            ('owner_email', 'owner__email'), ('rental_amount', 'rental_amount'), ('location', 'location'),
+            ('latitude', 'latitude'), ('longitude', 'longitude'), ('bedroom', 'bedroom'), ('bathroom', 'bathroom'),
+            ('apartment_size', 'apartment_size'), ('is_rented', 'is_rented'), ('review_count', 'review_count'),
+            ('average_rating', 'average_rating'), ('created_at', 'created_at'), ('updated_at', 'updated_at'),
+        ],
+    ),
+    'orders': (
+        lambda: Order.objects.order_by('created_at', 'id'),
+        [
+            ('id', 'id'), ('status', 'status'), ('user_email', 'user__email'), ('advertisement', 'advertisement_id'),
+            ('advertisement_title', 'advertisement__title'), ('full_name', 'full_name'), ('address', 'address'),
+            ('phone_number', 'phone_number'), ('payment_date', 'payment_date'), ('amount_paid', 'amount_paid'), ('created_at', 'created_at'),
+        ],
+    ),
+    'rent_requests': (
+        lambda: RentRequest.objects.order_by('id'),
+        [
+            ('id', 'id'), ('status', 'status'), ('user_email', 'user__email'), ('advertisement', 'advertisement_id'),
+            ('advertisement_title', 'advertisement__title'), ('created_at', 'created_at'),
+        ],
+    ),
+}
+
+
+class Echo:
+    # csv.writer only needs `write`, returning the line lets the generator yield it
+    def write(self, value):
+        return value
+
+
+def iter_rows(dataset, chunk_size=CHUNK_SIZE):
+    get_queryset, columns = DATASETS[dataset]
+    # values_list + iterator: tuples straight from a server-side cursor, `chunk_size` rows in memory at a time
+    return get_queryset().values_list(*[lookup for header, lookup in columns]).iterator(chunk_size=chunk_size)
+
+
+def iter_csv(dataset, chunk_size=CHUNK_SIZE):
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for header, lookup in DATASETS[dataset][1]])
+    for row in iter_rows(dataset, chunk_size):
+        yield writer.writerow(row)
+
+
+def iter_ndjson(dataset, chunk_size=CHUNK_SIZE):
+    headers = [header for header, lookup in DATASETS[dataset][1]]
+    encoder = DjangoJSONEncoder()
+    for row in iter_rows(dataset, chunk_size):
+        yield encoder.encode(dict(zip(headers, row))) + '\n'
+
+
+def export(dataset, export_format, chunk_size=CHUNK_SIZE):
+    return (iter_csv if export_format == CSV else iter_ndjson)(dataset, chunk_size)
@@ -0,0 +1,92 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import BaseSerializer
+
+
+def split_param(value):
+    return [name.strip() for name in value.split(',') if name.strip()] if value else []
+
+
+class SparseFieldsetMixin:
+    # `?fields=a,b` keeps only those fields in the response, `?omit=c,d` drops fields.
+    # The queryset is pruned to match: `.only()` the needed columns and select/prefetch
+    # only the relations that are still rendered.
+    fields_query_param = 'fields'
+    omit_query_param = 'omit'
+    # serializer fields that are computed from a relation (e.g. a SerializerMethodField) -> that relation
+    sparse_field_relations = {}
+
+    def is_sparse_request(self):
+        params = self.request.query_params
+        return self.request.method == 'GET' and bool(params.get(self.fields_query_param) or params.get(self.omit_query_param))
+
+    def get_sparse_field_names(self, available):
+        if not self.is_sparse_request():
+            return None
+        requested = split_param(self.request.query_params.get(self.fields_query_param))
+        omitted = set(split_param(self.request.query_params.get(self.omit_query_param)))
+        errors = {}
+        for param, names in ((self.fields_query_param, requested), (self.omit_query_param, sorted(omitted))):
+            unknown = [name for name in names if name not in available]
+            if unknown:
+                errors[param] = [f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(available)}."]
+        if errors:
+            raise ValidationError(errors)
+        names = [name for name in available if not requested or name in requested]
+        return [name for name in names if name not in omitted]
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        target = getattr(serializer, 'child', serializer)
+        keep = self.get_sparse_field_names(list(target.fields))
+        if keep is not None:
+            for name in list(target.fields):
+                if name not in keep:
+                    target.fields.pop(name)
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if not self.is_sparse_request():
+            return queryset
+        serializer = self.get_serializer_class()(context=self.get_serializer_context())
+        fields = {name: field for name, field in serializer.fields.items() if not field.write_only}
+        return self.prune_queryset(queryset, fields, self.get_sparse_field_names(list(fields)))
+
+    def get_sort_columns(self):
+        # cursor pagination reads the sort columns from the rows, keep them loaded
+        orderings = getattr(self.pagination_class, 'sort_orderings', {})
+        return {column.lstrip('-') for ordering in orderings.values() for column in ordering}
+
+    def prune_queryset(self, queryset, fields, keep):
+        opts = queryset.model._meta
+        only = {opts.pk.name} | self.get_sort_columns()
+        select_related, prefetch_related = set(), set()
+
+        for name in keep:
+            field = fields[name]
+            if name in self.sparse_field_relations:
+                relation = self.sparse_field_relations[name]
+                only.add(relation)
+                select_related.add(relation)
+                continue
+            try:
+                model_field = opts.get_field(field.source.split('.')[0])
+            except FieldDoesNotExist:
+                continue
+
+            if model_field.many_to_many or model_field.one_to_many:
+                prefetch_related.add(model_field.name)
+            elif model_field.is_relation:
+                only.add(model_field.name)
+                if isinstance(field, BaseSerializer):
+                    select_related.add(model_field.name)
+            else:
+                only.add(model_field.name)
+
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset.only(*only)
@@ -0,0 +1,29 @@
+import sys
+from django.core.management.base import BaseCommand
+from api import exports
+
+
+class Command(BaseCommand):
+    help = 'Stream advertisements, orders or rent requests to a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(exports.DATASETS))
+        parser.add_argument('--format', choices=list(exports.CONTENT_TYPES), default=exports.CSV)
+        parser.add_argument('--output', help='File to write, standard output by default')
+        parser.add_argument('--chunk-size', type=int, default=exports.CHUNK_SIZE, help='Rows fetched from the database cursor at a time')
+
+    def handle(self, *args, **options):
+        output = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+        rows = 0
+        try:
+            for line in exports.export(options['dataset'], options['format'], options['chunk_size']):
+                output.write(line)
+                rows += 1
+        finally:
+            if options['output']:
+                output.close()
+
+        if options['output']:
+            # the csv header is a line too
+            rows -= options['format'] == exports.CSV
+            self.stdout.write(self.style.SUCCESS(f"Exported {rows} {options['dataset']} to {options['output']}"))
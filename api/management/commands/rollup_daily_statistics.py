@@ -0,0 +1,23 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from api import statistics
+
+
+class Command(BaseCommand):
+    help = 'Update the daily statistics rollup, from the last rolled up day (which may have been partial) to today. Scheduled daily by the /api/v1/cron/ job, safe to run as often as needed. Status and category changes of older advertisements are applied to the rolled up days as they happen, --since rebuilds the days from scratch after changes made outside the app'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat, help='Rebuild from this day (YYYY-MM-DD) instead of the last rolled up day')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        start = options['since'] or statistics.last_rolled_date() or statistics.first_activity_date()
+        if start is None:
+            self.stdout.write('Nothing to roll up yet')
+            return
+        if start > today:
+            raise CommandError('--since is in the future')
+
+        days = statistics.rollup(start, today)
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {days} days from {start} to {today}'))
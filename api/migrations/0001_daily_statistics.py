@@ -0,0 +1,51 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('advertisement', '0012_advertisement_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('users', models.PositiveIntegerField(default=0)),
+                ('advertisements', models.PositiveIntegerField(default=0)),
+                ('pending_advertisements', models.PositiveIntegerField(default=0)),
+                ('approved_advertisements', models.PositiveIntegerField(default=0)),
+                ('rejected_advertisements', models.PositiveIntegerField(default=0)),
+                ('rent_requests', models.PositiveIntegerField(default=0)),
+                ('orders', models.PositiveIntegerField(default=0)),
+                ('booked_orders', models.PositiveIntegerField(default=0)),
+                ('booked_revenue', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyCategoryStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('advertisements', models.PositiveIntegerField(default=0)),
+                ('pending_advertisements', models.PositiveIntegerField(default=0)),
+                ('approved_advertisements', models.PositiveIntegerField(default=0)),
+                ('rejected_advertisements', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_statistics', to='advertisement.category')),
+            ],
+            options={
+                'ordering': ['date', 'category'],
+                'constraints': [models.UniqueConstraint(fields=('date', 'category'), name='daily_category_statistic_unique')],
+            },
+        ),
+    ]
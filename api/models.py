@@ -1,3 +1,42 @@
 from django.db import models
+from advertisement.models import Category
 
-# Create your models here.
+
+class DailyStatistic(models.Model):
+    # running totals up to the end of `date`, filled by `manage.py rollup_daily_statistics`.
+    # Any date range is the difference of two rows, one day is the difference to the row before.
+    date = models.DateField(unique=True)
+    users = models.PositiveIntegerField(default=0)
+    advertisements = models.PositiveIntegerField(default=0)
+    pending_advertisements = models.PositiveIntegerField(default=0)
+    approved_advertisements = models.PositiveIntegerField(default=0)
+    rejected_advertisements = models.PositiveIntegerField(default=0)
+    rent_requests = models.PositiveIntegerField(default=0)
+    orders = models.PositiveIntegerField(default=0)
+    booked_orders = models.PositiveIntegerField(default=0)
+    booked_revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['date']
+
+    def __str__(self):
+        return f"Statistics up to {self.date}"
+
+
+class DailyCategoryStatistic(models.Model):
+    # running totals of new advertisements per category, one row per category and day
+    date = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='daily_statistics')
+    advertisements = models.PositiveIntegerField(default=0)
+    pending_advertisements = models.PositiveIntegerField(default=0)
+    approved_advertisements = models.PositiveIntegerField(default=0)
+    rejected_advertisements = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['date', 'category']
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'category'], name='daily_category_statistic_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.category} statistics up to {self.date}"
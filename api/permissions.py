@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
 from rest_framework import permissions
 
 class IsAdminOrReadOnly(permissions.BasePermission):
@@ -17,4 +19,11 @@ class IsAdvertisementOwnerOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
 
-        return obj.advertisement.owner == request.user
\ No newline at end of file
+        return obj.advertisement.owner == request.user
+
+
+class IsCronRequest(permissions.BasePermission):
+
+    def has_permission(self, request, view):
+        secret = settings.CRON_SECRET
+        return bool(secret) and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {secret}')
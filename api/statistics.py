@@ -0,0 +1,196 @@
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from advertisement.models import Advertisement, Category
+from api.models import DailyCategoryStatistic, DailyStatistic
+from bookings.models import Order, RentRequest
+from users.models import User
+
+ADVERTISEMENT_METRICS = {
+    'advertisements': Count('id'),
+    'pending_advertisements': Count('id', filter=Q(status=Advertisement.PENDING)),
+    'approved_advertisements': Count('id', filter=Q(status=Advertisement.APPROVED)),
+    'rejected_advertisements': Count('id', filter=Q(status=Advertisement.REJECTED)),
+}
+STATUS_METRICS = {
+    Advertisement.PENDING: 'pending_advertisements',
+    Advertisement.APPROVED: 'approved_advertisements',
+    Advertisement.REJECTED: 'rejected_advertisements',
+}
+METRICS = ['users', *ADVERTISEMENT_METRICS, 'rent_requests', 'orders', 'booked_orders', 'booked_revenue']
+CATEGORY_METRICS = list(ADVERTISEMENT_METRICS)
+
+
+def day_range(queryset, field, start, end):
+    # a datetime range instead of `__date` lookups, so the index on `field` is usable
+    current_timezone = timezone.get_current_timezone()
+    return queryset.filter(**{
+        f'{field}__gte': timezone.make_aware(datetime.combine(start, time.min), current_timezone),
+        f'{field}__lt': timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), current_timezone),
+    })
+
+
+def count_per_day(queryset, field, start, end, group_by=(), **aggregates):
+    rows = day_range(queryset, field, start, end).order_by().annotate(day=TruncDate(field)).values('day', *group_by).annotate(**aggregates)
+    return {(row.pop('day'), *[row.pop(name) for name in group_by]): row for row in rows}
+
+
+def collect_daily(start, end):
+    daily = defaultdict(dict)
+    for key, row in count_per_day(User.objects.all(), 'date_joined', start, end, users=Count('id')).items():
+        daily[key].update(row)
+    for key, row in count_per_day(Advertisement.objects.all(), 'created_at', start, end, **ADVERTISEMENT_METRICS).items():
+        daily[key].update(row)
+    for key, row in count_per_day(RentRequest.objects.all(), 'created_at', start, end, rent_requests=Count('id')).items():
+        daily[key].update(row)
+    for key, row in count_per_day(Order.objects.all(), 'created_at', start, end, orders=Count('id')).items():
+        daily[key].update(row)
+    # revenue is booked on the payment day, at the amount paid
+    booked = Order.objects.filter(status=Order.BOOKED)
+    for key, row in count_per_day(booked, 'payment_date', start, end, booked_orders=Count('id'), booked_revenue=Sum('amount_paid')).items():
+        daily[key].update(row)
+
+    per_category = count_per_day(Advertisement.objects.all(), 'created_at', start, end, group_by=['category'], **ADVERTISEMENT_METRICS)
+    return daily, per_category
+
+
+def rollup(start, end):
+    # rewrites every row from `start` on, re-running it for the same days gives the same rows
+    daily, per_category = collect_daily(start, end)
+    previous = DailyStatistic.objects.filter(date__lt=start).last()
+    totals = {metric: getattr(previous, metric) if previous else 0 for metric in METRICS}
+    category_totals = defaultdict(lambda: dict.fromkeys(CATEGORY_METRICS, 0))
+    if previous:
+        for row in DailyCategoryStatistic.objects.filter(date=previous.date).values('category', *CATEGORY_METRICS):
+            category_totals[row.pop('category')] = row
+
+    category_ids = list(Category.objects.values_list('id', flat=True))
+    statistics, category_statistics = [], []
+    day = start
+    while day <= end:
+        for metric, value in daily.get((day,), {}).items():
+            totals[metric] += value or 0
+        statistics.append(DailyStatistic(date=day, **totals))
+        for category_id in category_ids:
+            category_total = category_totals[category_id]
+            for metric, value in per_category.get((day, category_id), {}).items():
+                category_total[metric] += value
+            category_statistics.append(DailyCategoryStatistic(date=day, category_id=category_id, **category_total))
+        day += timedelta(days=1)
+
+    with transaction.atomic():
+        DailyStatistic.objects.filter(date__gte=start).delete()
+        DailyCategoryStatistic.objects.filter(date__gte=start).delete()
+        DailyStatistic.objects.bulk_create(statistics)
+        DailyCategoryStatistic.objects.bulk_create(category_statistics)
+    return len(statistics)
+
+
+def first_activity_date():
+    dates = [
+        model.objects.order_by(field).values_list(field, flat=True).first()
+        for model, field in ((User, 'date_joined'), (Advertisement, 'created_at'), (RentRequest, 'created_at'), (Order, 'created_at'))
+    ]
+    dates = [timezone.localtime(value).date() for value in dates if value]
+    return min(dates, default=None)
+
+
+def difference(end_row, start_row, metrics):
+    return {metric: (getattr(end_row, metric) if end_row else 0) - (getattr(start_row, metric) if start_row else 0) for metric in metrics}
+
+
+def live_daily(start, end):
+    # the last rolled up day may have been partial, from it on the days are counted from the tables themselves,
+    # so the figures are current even when the rollup has not run for a while
+    last_rolled = last_rolled_date()
+    live_start = max(start, last_rolled) if last_rolled else start
+    if live_start > end:
+        return live_start, {}, {}
+    return (live_start, *collect_daily(live_start, end))
+
+
+def add_live(totals, rows):
+    for row in rows:
+        for metric, value in row.items():
+            totals[metric] += value or 0
+    return totals
+
+
+def range_totals(start, end, live=None):
+    # two row lookups on the unique date index for the rolled up days, plus the days after the last rollup
+    live_start, daily, _ = live or live_daily(start, end)
+    end_row = DailyStatistic.objects.filter(date__lte=end, date__lt=live_start).last()
+    start_row = DailyStatistic.objects.filter(date__lt=start).last() if end_row else None
+    return add_live(difference(end_row, start_row, METRICS), daily.values())
+
+
+def category_totals(start, end, live=None):
+    live_start, _, per_category = live or live_daily(start, end)
+    end_row = DailyStatistic.objects.filter(date__lte=end, date__lt=live_start).only('date').last()
+    start_row = DailyStatistic.objects.filter(date__lt=start).only('date').last() if end_row else None
+    end_rows = {row.category_id: row for row in DailyCategoryStatistic.objects.filter(date=end_row.date)} if end_row else {}
+    start_rows = {row.category_id: row for row in DailyCategoryStatistic.objects.filter(date=start_row.date)} if start_row else {}
+    live_rows = defaultdict(list)
+    for (day, category_id), row in per_category.items():
+        live_rows[category_id].append(row)
+    return [
+        {'category': category_id, **add_live(difference(end_rows.get(category_id), start_rows.get(category_id), CATEGORY_METRICS), live_rows[category_id])}
+        for category_id in sorted(end_rows.keys() | live_rows.keys())
+    ]
+
+
+def daily_series(start, end, live=None):
+    live_start, daily, _ = live or live_daily(start, end)
+    previous = DailyStatistic.objects.filter(date__lt=start).last()
+    series = []
+    for row in DailyStatistic.objects.filter(date__gte=start, date__lte=end, date__lt=live_start):
+        series.append({'date': row.date, **difference(row, previous, METRICS)})
+        previous = row
+    day = live_start
+    while day <= end:
+        series.append({'date': day, **add_live(dict.fromkeys(METRICS, 0), [daily.get((day,), {})])})
+        day += timedelta(days=1)
+    return series
+
+
+def last_rolled_date():
+    return DailyStatistic.objects.order_by('-date').values_list('date', flat=True).first()
+
+
+def counted_in(values):
+    return ['advertisements', STATUS_METRICS[values['status']]] if values['status'] in STATUS_METRICS else ['advertisements']
+
+
+def listings_changed(transitions):
+    # keeps the rolled up days current when advertisements change status or category, or are deleted.
+    # `transitions` are (old values, new values) pairs with status, category_id and created_at; only the
+    # complete days before the last rolled up one are updated, the rest is counted live or rewritten by the next rollup
+    changes = defaultdict(Counter)
+    for old, new in transitions:
+        if old and new and (old['status'], old['category_id']) == (new['status'], new['category_id']):
+            continue
+        for values, delta in ((old, -1), (new, 1)):
+            if values:
+                day = timezone.localdate(values['created_at'])
+                for metric in counted_in(values):
+                    changes[day, values['category_id']][metric] += delta
+    if not changes:
+        return
+
+    last_rolled = last_rolled_date()
+    totals = defaultdict(Counter)
+    for (day, category_id), deltas in changes.items():
+        deltas = {metric: delta for metric, delta in deltas.items() if delta}
+        if last_rolled is None or day >= last_rolled or not deltas:
+            continue
+        DailyCategoryStatistic.objects.filter(category_id=category_id, date__gte=day, date__lt=last_rolled).update(
+            **{metric: F(metric) + delta for metric, delta in deltas.items()}
+        )
+        totals[day].update(deltas)
+    for day, deltas in totals.items():
+        deltas = {metric: delta for metric, delta in deltas.items() if delta}
+        if deltas:
+            DailyStatistic.objects.filter(date__gte=day, date__lt=last_rolled).update(**{metric: F(metric) + delta for metric, delta in deltas.items()})
@@ -1,3 +1,101 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from advertisement.models import Advertisement, Category
+from api import statistics
+from users.models import User
 
-# Create your tests here.
+
+class DailyStatisticsTests(TestCase):
+    def setUp(self):
+        self.categories = [Category.objects.create(name='Flat'), Category.objects.create(name='House')]
+        self.owner = User.objects.create_user('owner@example.com')
+        self.advertisements = [self.create_advertisement(self.categories[number % 2]) for number in range(4)]
+        self.today = timezone.localdate()
+        self.start = self.today - timedelta(days=10)
+        # created a few days ago, so the rollup has complete days for them
+        Advertisement.objects.update(created_at=timezone.now() - timedelta(days=5))
+
+    def create_advertisement(self, category):
+        return Advertisement.objects.create(
+            title='Flat', description='-', owner=self.owner, category=category,
+            rental_amount=Decimal('1000'), location='Dhanmondi', bedroom=1, bathroom=1, apartment_size=Decimal('100')
+        )
+
+    def figures(self):
+        live = statistics.live_daily(self.start, self.today)
+        return (
+            statistics.range_totals(self.start, self.today, live),
+            statistics.category_totals(self.start, self.today, live),
+            statistics.daily_series(self.start, self.today, live),
+        )
+
+    def rebuilt_figures(self):
+        statistics.rollup(self.start, self.today)
+        return self.figures()
+
+    def test_figures_without_any_rollup_are_counted_live(self):
+        totals = statistics.range_totals(self.start, self.today)
+        self.assertEqual(totals['advertisements'], 4)
+        self.assertEqual(totals['pending_advertisements'], 4)
+
+    def test_days_after_the_rollup_are_counted_live(self):
+        statistics.rollup(self.start, self.today - timedelta(days=1))
+        self.create_advertisement(self.categories[0])
+
+        figures = self.figures()
+        self.assertEqual(figures[0]['advertisements'], 5)
+        self.assertEqual(figures, self.rebuilt_figures())
+
+    def test_changes_to_rolled_up_advertisements_are_applied(self):
+        statistics.rollup(self.start, self.today)
+        advertisement = Advertisement.objects.get(pk=self.advertisements[0].pk)
+        advertisement.status = Advertisement.APPROVED
+        advertisement.save()
+        advertisement = Advertisement.objects.get(pk=self.advertisements[1].pk)
+        advertisement.category = self.categories[0]
+        advertisement.save()
+        Advertisement.objects.get(pk=self.advertisements[2].pk).delete()
+
+        figures = self.figures()
+        self.assertEqual(figures[0]['approved_advertisements'], 1)
+        self.assertEqual(figures, self.rebuilt_figures())
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create_user('owner@example.com')
+        self.advertisement = Advertisement.objects.create(
+            title='Flat', description='-', owner=owner, category=Category.objects.create(name='Flat'), status=Advertisement.APPROVED,
+            rental_amount=Decimal('1000'), location='Dhanmondi', bedroom=1, bathroom=1, apartment_size=Decimal('100')
+        )
+
+    def get(self, url, **params):
+        return APIClient().get(url, params)
+
+    def test_fields_keeps_only_those(self):
+        response = self.get('/api/v1/advertisements/', fields='id,title,owner')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title', 'owner'})
+
+        response = self.get(f'/api/v1/advertisements/{self.advertisement.pk}/', fields='id,images')
+        self.assertEqual(response.data, {'id': self.advertisement.pk, 'images': []})
+
+    def test_omit_drops_those(self):
+        response = self.get('/api/v1/advertisements/', omit='description,images')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('description', response.data['results'][0])
+        self.assertNotIn('images', response.data['results'][0])
+        self.assertIn('title', response.data['results'][0])
+
+    def test_unknown_fields_are_refused(self):
+        for params in [{'fields': 'id,secret'}, {'omit': 'secret'}]:
+            with self.subTest(params):
+                for url in ['/api/v1/advertisements/', f'/api/v1/advertisements/{self.advertisement.pk}/']:
+                    response = self.get(url, **params)
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn('secret', str(response.data))
@@ -3,6 +3,7 @@ from rest_framework_nested import routers
 from advertisement.views import AdvertisementViewSet, CategoryViewSet, AdvertisementImageViewSet, ReviewViewSet
 from bookings.views import RentRequestViewSet, MyRentRequestViewSet, FavouriteViewSet, OrderViewSet, payment_initiate, payment_success, payment_fail, payment_cancel, HasHouseRented
 from users.views import MyAdvertisementViewSet, AdminDashboardViewSet, CustomUserViewSet, GoogleLoginView
+from api.views import AdminExportView, CronView
 
 router = routers.DefaultRouter()
 
@@ -34,5 +35,7 @@ urlpatterns = [
     path('payment/success/', payment_success, name='payment-success'),
     path('payment/fail/', payment_fail, name='payment-fail'),
     path('payment/cancel/', payment_cancel, name='payment-cancel'),
-    path('orders/has_rented/<int:advertise_id>/', HasHouseRented.as_view(), name='has-rented')
+    path('orders/has_rented/<int:advertise_id>/', HasHouseRented.as_view(), name='has-rented'),
+    path('admin/exports/<str:dataset>.<str:export_format>', AdminExportView.as_view(), name='admin-export'),
+    path('cron/', CronView.as_view(), name='cron')
 ]
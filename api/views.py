@@ -1,3 +1,44 @@
-from django.shortcuts import render
+from io import StringIO
+from django.core.management import call_command
+from django.http import StreamingHttpResponse
+from django.utils.timezone import now
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import exceptions, permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from api import exports
+from api.permissions import IsCronRequest
 
-# Create your views here.
+# the periodic jobs, in order; each one is safe to run as often as needed
+CRON_JOBS = ['rollup_daily_statistics', 'process_payment_callbacks', 'expire_unpaid_orders']
+
+
+class AdminExportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_summary='Download a full export of advertisements, orders or rent requests',
+        operation_description='Only admin can export all advertisements, orders or rent requests as `csv` or `ndjson`, the file is streamed row by row'
+    )
+    def get(self, request, dataset, export_format):
+        if dataset not in exports.DATASETS or export_format not in exports.CONTENT_TYPES:
+            raise exceptions.NotFound()
+
+        response = StreamingHttpResponse(exports.export(dataset, export_format), content_type=exports.CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = f'attachment; filename="{dataset}-{now():%Y%m%d-%H%M%S}.{export_format}"'
+        return response
+
+
+class CronView(APIView):
+    # called by the Vercel cron of vercel.json, authenticated by the shared CRON_SECRET only
+    authentication_classes = []
+    permission_classes = [IsCronRequest]
+    swagger_schema = None
+
+    def get(self, request):
+        results = {}
+        for job in CRON_JOBS:
+            output = StringIO()
+            call_command(job, stdout=output)
+            results[job] = output.getvalue().strip()
+        return Response(results)
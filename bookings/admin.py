@@ -1,6 +1,7 @@
 from django.contrib import admin
-from bookings.models import RentRequest, Favourite, Order
+from bookings.models import RentRequest, Favourite, Order, PaymentCallback
 
 admin.site.register(RentRequest)
 admin.site.register(Favourite)
 admin.site.register(Order)
+admin.site.register(PaymentCallback)
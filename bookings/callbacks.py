@@ -0,0 +1,133 @@
+import logging
+from decimal import Decimal, InvalidOperation
+from uuid import UUID
+from django.db import transaction
+from django.utils import timezone
+from bookings.models import Order, PaymentCallback
+
+MAX_ATTEMPTS = 5
+# what the gateway posts to the success url for a completed payment
+PAID_STATUSES = ('VALID', 'VALIDATED')
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentNotValid(Exception):
+    pass
+
+
+class RefundDue(Exception):
+    # the money arrived but the order can not be booked, it has to be refunded by hand
+    pass
+
+
+class OrderCancelled(RefundDue):
+    pass
+
+
+class AlreadyRented(RefundDue):
+    pass
+
+
+class AmountMismatch(RefundDue):
+    pass
+
+
+def parse_order_id(tran_id):
+    # transaction ids are `tnx_<order id>`, see payment_initiate
+    try:
+        return UUID(tran_id.split('_', 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def record(data):
+    # the gateway posts a form, keep it as plain single values
+    data = data.dict() if hasattr(data, 'dict') else dict(data)
+    tran_id = data.get('tran_id')
+    if not tran_id:
+        return None
+    # a repeated delivery hits the unique tran_id and is dropped
+    PaymentCallback.objects.bulk_create(
+        [PaymentCallback(tran_id=tran_id, order_id=parse_order_id(tran_id), payload=data)],
+        ignore_conflicts=True
+    )
+    return tran_id
+
+
+def paid_amount(callback):
+    try:
+        amount = Decimal(callback.payload['amount'])
+    except (KeyError, TypeError, InvalidOperation):
+        return None
+    return amount if amount.is_finite() else None
+
+
+def book_order(callback):
+    # the advertisement row is locked too, so two orders of the same house are booked one after the other
+    order = Order.objects.select_for_update().select_related('advertisement').filter(pk=callback.order_id).first()
+    if order is None:
+        raise LookupError(f'No order for transaction {callback.tran_id}')
+    if order.status == Order.BOOKED:
+        return
+    # the success url takes posts from anyone, only a paid status for the exact rent books the order
+    if callback.payload.get('status') not in PAID_STATUSES:
+        raise PaymentNotValid(f"Payment status {callback.payload.get('status')!r} is not a completed payment")
+    if order.status == Order.CANCELLED:
+        raise OrderCancelled(f'Order {order.pk} was cancelled before its payment arrived')
+    amount = paid_amount(callback)
+    if amount != order.advertisement.rental_amount:
+        raise AmountMismatch(f'Order {order.pk} was paid {amount}, the rent is {order.advertisement.rental_amount}')
+    if order.advertisement.is_rented or Order.objects.filter(advertisement_id=order.advertisement_id, status=Order.BOOKED).exclude(pk=order.pk).exists():
+        raise AlreadyRented(f'Advertisement {order.advertisement_id} was already rented when order {order.pk} was paid')
+
+    order.status = Order.BOOKED
+    order.payment_date = callback.received_at
+    order.amount_paid = amount
+    order.save(update_fields=['status', 'payment_date', 'amount_paid'])
+    advertisement = order.advertisement
+    advertisement.is_rented = True
+    # saved through the model so the listing counters, indexes and caches follow
+    advertisement.save(update_fields=['is_rented', 'updated_at'])
+
+
+def handle(callback):
+    callback.attempts += 1
+    try:
+        with transaction.atomic():
+            book_order(callback)
+    except RefundDue as error:
+        callback.error = str(error)
+        callback.status = PaymentCallback.REFUND_DUE
+        logger.error('Payment %s needs a refund: %s', callback.tran_id, error)
+    except Exception as error:
+        callback.error = str(error)
+        if isinstance(error, (LookupError, PaymentNotValid)) or callback.attempts >= MAX_ATTEMPTS:
+            callback.status = PaymentCallback.FAILED
+    else:
+        callback.status = PaymentCallback.PROCESSED
+        callback.error = ''
+    if callback.status != PaymentCallback.PENDING:
+        callback.processed_at = timezone.now()
+    callback.save(update_fields=['status', 'attempts', 'error', 'processed_at'])
+    return callback.status
+
+
+def process(tran_id):
+    # handled right away by the callback request, whatever is left pending is retried by the worker
+    with transaction.atomic():
+        callback = PaymentCallback.objects.select_for_update(skip_locked=True).filter(tran_id=tran_id).first()
+        if callback is None or callback.status != PaymentCallback.PENDING:
+            return callback and callback.status
+        return handle(callback)
+
+
+def process_batch(batch_size=100):
+    # locked rows are skipped, so several workers can drain the queue side by side
+    with transaction.atomic():
+        callbacks = list(
+            PaymentCallback.objects.select_for_update(skip_locked=True)
+            .filter(status=PaymentCallback.PENDING).order_by('received_at', 'id')[:batch_size]
+        )
+        outcomes = [handle(callback) for callback in callbacks]
+    return len(callbacks), outcomes.count(PaymentCallback.PROCESSED), len(callbacks) - outcomes.count(PaymentCallback.PROCESSED) - outcomes.count(PaymentCallback.PENDING)
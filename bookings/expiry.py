@@ -0,0 +1,30 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from bookings.models import Order
+
+
+def expire_unpaid_orders(max_age, batch_size=500):
+    # short transactions of one bounded UPDATE each, the orders table is never locked for the whole sweep
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=max_age)
+    # an order whose gateway session is still open may be paid any moment
+    session_cutoff = now - timedelta(seconds=settings.SSLCOMMERZ['SESSION_TTL'])
+    stale = Order.objects.filter(status=Order.NOT_PAID, created_at__lt=cutoff).filter(
+        Q(payment_started_at__isnull=True) | Q(payment_started_at__lt=session_cutoff)
+    )
+    cancelled = batches = 0
+    while True:
+        with transaction.atomic():
+            # orders locked by a payment being started are skipped, the next sweep sees their payment_started_at
+            ids = list(stale.select_for_update(skip_locked=True).order_by('created_at').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            # the status is checked again by the UPDATE, an order booked in the meantime stays booked
+            cancelled += stale.filter(pk__in=ids).update(status=Order.CANCELLED)
+        batches += 1
+        if len(ids) < batch_size:
+            break
+    return cancelled, batches
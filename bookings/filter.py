@@ -0,0 +1,8 @@
+from django_filters.rest_framework import FilterSet
+from bookings.models import RentRequest
+
+
+class RentRequestFilter(FilterSet):
+    class Meta:
+        model = RentRequest
+        fields = ['status', 'advertisement']
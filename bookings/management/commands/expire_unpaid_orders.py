@@ -0,0 +1,24 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from bookings.expiry import expire_unpaid_orders
+
+
+class Command(BaseCommand):
+    help = 'Cancel orders left unpaid for longer than UNPAID_ORDER_MAX_AGE, so they stop blocking a new order of the same advertisement'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age', type=int, default=settings.UNPAID_ORDER_MAX_AGE, help='Seconds an order may stay unpaid')
+        parser.add_argument('--batch-size', type=int, default=500, help='Orders cancelled per UPDATE')
+        parser.add_argument('--interval', type=float, default=0, help='Seconds between sweeps, 0 sweeps once and exits')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            cancelled, batches = expire_unpaid_orders(options['max_age'], options['batch_size'])
+            elapsed = time.monotonic() - started
+            if cancelled or not options['interval']:
+                self.stdout.write(f'Cancelled {cancelled} unpaid orders in {batches} batches, {elapsed:.2f}s ({cancelled / elapsed if elapsed else 0:.0f} rows/s)')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,91 @@
+import json
+import random
+import threading
+import time
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from uuid import uuid4
+from django.core.management.base import BaseCommand
+
+# session key -> the posted session fields, the payment page posts back to their success_url
+SESSIONS = {}
+SESSIONS_LOCK = threading.Lock()
+
+
+class GatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = 0
+    failure_rate = 0
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/gwprocess/v4/api.php':
+            return self.send_body(404, 'text/plain', b'not found')
+
+        length = int(self.headers.get('Content-Length') or 0)
+        fields = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+        time.sleep(self.latency)
+        if random.random() < self.failure_rate:
+            return self.send_body(502, 'text/plain', b'bad gateway')
+
+        missing = [field for field in ('store_id', 'store_passwd', 'total_amount', 'tran_id', 'success_url') if not fields.get(field)]
+        if missing:
+            return self.send_json({'status': 'FAILED', 'failedreason': f"Missing {', '.join(missing)}"})
+
+        session_key = uuid4().hex
+        with SESSIONS_LOCK:
+            SESSIONS[session_key] = fields
+        host = self.headers.get('Host')
+        self.send_json({'status': 'SUCCESS', 'sessionkey': session_key, 'GatewayPageURL': f'http://{host}/pay/{session_key}'})
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        with SESSIONS_LOCK:
+            fields = SESSIONS.get(path.removeprefix('/pay/')) if path.startswith('/pay/') else None
+        if fields is None:
+            return self.send_body(404, 'text/plain', b'not found')
+
+        page = (
+            f"<html><body><p>Fake payment of {escape(fields['total_amount'])} {escape(fields.get('currency', ''))}</p>"
+            f"<form method='post' action='{escape(fields['success_url'])}'>"
+            f"<input type='hidden' name='tran_id' value='{escape(fields['tran_id'])}'>"
+            f"<input type='hidden' name='amount' value='{escape(fields['total_amount'])}'>"
+            f"<input type='hidden' name='status' value='VALID'>"
+            f"<button type='submit'>Pay</button></form></body></html>"
+        )
+        self.send_body(200, 'text/html', page.encode())
+
+    def send_json(self, data):
+        self.send_body(200, 'application/json', json.dumps(data).encode())
+
+    def send_body(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Run a local stand-in for the SSLCommerz session API, point SSLCOMMERZ_API_URL at it to exercise the payment flow offline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0, help='Seconds to wait before answering a session request')
+        parser.add_argument('--failure-rate', type=float, default=0, help='Share of session requests answered with a 502, between 0 and 1')
+
+    def handle(self, *args, **options):
+        handler = type('Handler', (GatewayHandler,), {'latency': options['latency'], 'failure_rate': options['failure_rate']})
+        server = ThreadingHTTPServer((options['host'], options['port']), handler)
+        server.daemon_threads = True
+        self.stdout.write(f"Fake payment gateway on http://{options['host']}:{options['port']}, set SSLCOMMERZ_API_URL to it")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,26 @@
+import time
+from django.core.management.base import BaseCommand
+from bookings import callbacks
+
+
+class Command(BaseCommand):
+    help = 'Book the orders of payment callbacks left pending by the callback request. Runs until the queue is empty, or keeps polling with --interval'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Callbacks handled per transaction')
+        parser.add_argument('--interval', type=float, default=0, help='Seconds between polls of the queue, 0 drains it once and exits')
+
+    def handle(self, *args, **options):
+        while True:
+            picked = processed = failed = 0
+            while True:
+                batch = callbacks.process_batch(options['batch_size'])
+                picked, processed, failed = picked + batch[0], processed + batch[1], failed + batch[2]
+                # stop on a short batch, or one where every callback is waiting for a retry
+                if batch[0] < options['batch_size'] or not (batch[1] or batch[2]):
+                    break
+            if picked or not options['interval']:
+                self.stdout.write(f'{picked} callbacks: {processed} processed, {failed} failed, {picked - processed - failed} left for retry')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisement', '0006_listing_sort_indexes'),
+        ('bookings', '0003_order'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='order_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['created_at', 'id'], name='order_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rentrequest',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='rentrequest_user_created_idx'),
+        ),
+    ]
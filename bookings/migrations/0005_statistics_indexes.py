@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisement', '0012_advertisement_created_index'),
+        ('bookings', '0004_listing_sort_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'payment_date'], name='order_status_payment_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rentrequest',
+            index=models.Index(fields=['created_at'], name='rentrequest_created_idx'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:36
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Case, Count, Value, When
+
+
+def duplicate_groups(queryset):
+    rows = queryset.order_by().values('advertisement', 'user').annotate(total=Count('id')).filter(total__gt=1)
+    for row in rows.iterator():
+        yield queryset.filter(advertisement=row['advertisement'], user=row['user'])
+
+
+def remove_duplicates(apps, schema_editor):
+    RentRequest = apps.get_model('bookings', 'RentRequest')
+    Favourite = apps.get_model('bookings', 'Favourite')
+    Order = apps.get_model('bookings', 'Order')
+
+    # keep the request that decided the most (approved, then pending), then the oldest
+    rent_request_priority = Case(When(status='Approved', then=Value(0)), When(status='Pending', then=Value(1)), default=Value(2))
+    for group in duplicate_groups(RentRequest.objects.all()):
+        ids = list(group.order_by(rent_request_priority, 'created_at').values_list('id', flat=True))
+        RentRequest.objects.filter(pk__in=ids[1:]).delete()
+
+    for group in duplicate_groups(Favourite.objects.all()):
+        ids = list(group.values_list('id', flat=True))
+        Favourite.objects.filter(pk__in=ids[1:]).delete()
+
+    # orders are kept for the records, the extra active ones are cancelled
+    order_priority = Case(When(status='Booked', then=Value(0)), default=Value(1))
+    for group in duplicate_groups(Order.objects.exclude(status='Cancelled')):
+        ids = list(group.order_by(order_priority, 'created_at').values_list('id', flat=True))
+        Order.objects.filter(pk__in=ids[1:]).update(status='Cancelled')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisement', '0012_advertisement_created_index'),
+        ('bookings', '0005_statistics_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='favourite',
+            constraint=models.UniqueConstraint(fields=('advertisement', 'user'), name='favourite_unique_user_advertisement'),
+        ),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'Cancelled'), _negated=True), fields=('advertisement', 'user'), name='order_unique_active_user_advertisement'),
+        ),
+        migrations.AddConstraint(
+            model_name='rentrequest',
+            constraint=models.UniqueConstraint(fields=('advertisement', 'user'), name='rentrequest_unique_user_advertisement'),
+        ),
+    ]
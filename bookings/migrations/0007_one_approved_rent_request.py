@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:37
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def reject_extra_approvals(apps, schema_editor):
+    RentRequest = apps.get_model('bookings', 'RentRequest')
+    approved = RentRequest.objects.filter(status='Approved')
+    duplicated = approved.order_by().values('advertisement').annotate(total=Count('id')).filter(total__gt=1)
+    for row in duplicated.iterator():
+        # the first approval stands
+        ids = list(approved.filter(advertisement=row['advertisement']).order_by('created_at').values_list('id', flat=True))
+        RentRequest.objects.filter(pk__in=ids[1:]).update(status='Rejected')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisement', '0012_advertisement_created_index'),
+        ('bookings', '0006_unique_user_advertisement'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(reject_extra_approvals, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='rentrequest',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'Approved')), fields=('advertisement',), name='rentrequest_one_approved_per_advertisement'),
+        ),
+    ]
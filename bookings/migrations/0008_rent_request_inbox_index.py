@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('advertisement', '0012_advertisement_created_index'),
+        ('bookings', '0007_one_approved_rent_request'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rentrequest',
+            index=models.Index(fields=['advertisement', 'status', 'created_at'], name='rentrequest_adv_status_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_rent_request_inbox_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentCallback',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tran_id', models.CharField(max_length=100, unique=True)),
+                ('order_id', models.UUIDField(blank=True, null=True)),
+                ('payload', models.JSONField(default=dict)),
+                ('status', models.CharField(choices=[('Pending', 'Pending'), ('Processed', 'Processed'), ('Failed', 'Failed')], default='Pending', max_length=15)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'Pending')), fields=['received_at', 'id'], name='callback_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0010_order_expiry_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='paymentcallback',
+            name='status',
+            field=models.CharField(choices=[('Pending', 'Pending'), ('Processed', 'Processed'), ('Failed', 'Failed'), ('Refund Due', 'Refund Due')], default='Pending', max_length=15),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:53
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_amount_paid(apps, schema_editor):
+    # earlier bookings kept no amount, the rent of the advertisement is the best record of it
+    Order = apps.get_model('bookings', 'Order')
+    Advertisement = apps.get_model('advertisement', 'Advertisement')
+    Order.objects.filter(status='Booked', amount_paid__isnull=True).update(
+        amount_paid=Subquery(Advertisement.objects.filter(pk=OuterRef('advertisement_id')).values('rental_amount')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0011_payment_callback_refund_due'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='amount_paid',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.RunPython(backfill_amount_paid, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0012_order_amount_paid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='payment_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -18,6 +18,19 @@ class RentRequest(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='rentrequest_user_created_idx'),
+            models.Index(fields=['created_at'], name='rentrequest_created_idx'),
+            # owner inbox: requests of the owner's advertisements by status, newest first
+            models.Index(fields=['advertisement', 'status', 'created_at'], name='rentrequest_adv_status_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['advertisement', 'user'], name='rentrequest_unique_user_advertisement'),
+            # an advertisement is rented to one person
+            models.UniqueConstraint(fields=['advertisement'], condition=models.Q(status='Approved'), name='rentrequest_one_approved_per_advertisement'),
+        ]
+
     def __str__(self):
         return f"`{self.user.first_name}` request for rent {self.advertisement.title}"
 
@@ -27,10 +40,20 @@ class Favourite(models.Model):
     advertisement = models.ForeignKey(Advertisement, on_delete=models.CASCADE, related_name='favourite')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='favourite')
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['advertisement', 'user'], name='favourite_unique_user_advertisement'),
+        ]
+
     def __str__(self):
         return f"`{self.user.first_name}` Save as Favourite {self.advertisement.title}"
     
 
+class OrderQuerySet(models.QuerySet):
+    def active(self):
+        return self.exclude(status=Order.CANCELLED)
+
+
 class Order(models.Model):
     NOT_PAID = 'Not Paid'
     BOOKED = 'Booked'
@@ -48,7 +71,58 @@ class Order(models.Model):
     address = models.TextField()
     phone_number = models.CharField(max_length=20)
     payment_date = models.DateTimeField(blank=True, null=True)
+    # what the gateway reported as paid, the booked revenue statistics sum it
+    amount_paid = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+    # when the last gateway session was started, the unpaid order sweep leaves the order alone while it can still be paid
+    payment_started_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='order_user_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='order_created_idx'),
+            models.Index(fields=['status', 'payment_date'], name='order_status_payment_idx'),
+            # the unpaid order expiry sweep
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+        ]
+        constraints = [
+            # a cancelled order does not block ordering the same advertisement again
+            models.UniqueConstraint(fields=['advertisement', 'user'], condition=~models.Q(status='Cancelled'), name='order_unique_active_user_advertisement'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.first_name}'s order for {self.advertisement.title}"
+
+
+class PaymentCallback(models.Model):
+    PENDING = 'Pending'
+    PROCESSED = 'Processed'
+    FAILED = 'Failed'
+    # paid, but the order was cancelled, the house rented to someone else or the amount is wrong; refunded by hand
+    REFUND_DUE = 'Refund Due'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (PROCESSED, 'Processed'),
+        (FAILED, 'Failed'),
+        (REFUND_DUE, 'Refund Due')
+    ]
+    # the gateway may deliver the same transaction more than once, only the first delivery is kept
+    tran_id = models.CharField(max_length=100, unique=True)
+    order_id = models.UUIDField(blank=True, null=True)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=15, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # the worker's queue of callbacks still to process
+            models.Index(fields=['received_at', 'id'], condition=models.Q(status='Pending'), name='callback_pending_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.user.first_name}'s order for {self.advertisement.title}"
\ No newline at end of file
+        return f'{self.tran_id} ({self.status})'
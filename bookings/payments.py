@@ -0,0 +1,142 @@
+import threading
+import time
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class PaymentGatewayError(Exception):
+    pass
+
+
+class GatewayUnavailable(PaymentGatewayError):
+    # the gateway timed out, failed or the circuit is open; nothing was charged
+    pass
+
+
+class InvalidGatewayResponse(PaymentGatewayError):
+    # the gateway answered with something that is not a session reply
+    pass
+
+
+class PaymentInProgress(PaymentGatewayError):
+    pass
+
+
+class CircuitBreaker:
+    # after `failure_threshold` failures in a row calls fail fast for `recovery_time` seconds,
+    # then a single trial call decides whether the circuit closes again
+    def __init__(self, failure_threshold, recovery_time):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.recovery_time or self.trial_running:
+                return False
+            self.trial_running = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class SSLCommerzGateway:
+    session_path = '/gwprocess/v4/api.php'
+
+    def __init__(self, config):
+        self.config = config
+        self.base_url = config['API_URL'] or f"https://{'sandbox' if config['SANDBOX'] else 'securepay'}.sslcommerz.com"
+        self.timeout = (config['CONNECT_TIMEOUT'], config['READ_TIMEOUT'])
+        # long enough for every retried connect attempt plus the read, so the lock outlives the call
+        self.lock_timeout = (config['CONNECT_RETRIES'] + 1) * config['CONNECT_TIMEOUT'] + config['READ_TIMEOUT'] + 5
+        self.breaker = CircuitBreaker(config['FAILURE_THRESHOLD'], config['RECOVERY_TIME'])
+
+        # one pooled session per process; only connection errors are retried, the request never reached the gateway
+        self.http = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=config['POOL_SIZE'],
+            max_retries=Retry(total=config['CONNECT_RETRIES'], connect=config['CONNECT_RETRIES'], read=0, status=0, backoff_factor=0.1)
+        )
+        self.http.mount('https://', adapter)
+        self.http.mount('http://', adapter)
+
+    def session_key(self, order_id):
+        return f'payment:session:{order_id}'
+
+    def create_session(self, order_id, amount, post_body):
+        # a retried or double clicked payment gets the gateway session created the first time,
+        # the transaction id is per order so there is never a second session for it
+        cache_key = self.session_key(order_id)
+        payment_url = cache.get(cache_key)
+        if payment_url:
+            return payment_url
+
+        lock_key = f'{cache_key}:lock'
+        if not cache.add(lock_key, 1, self.lock_timeout):
+            raise PaymentInProgress('The payment for this order is being started, try again in a moment.')
+        try:
+            payment_url = cache.get(cache_key)
+            if not payment_url:
+                payment_url = self.request_session({**post_body, 'tran_id': f'tnx_{order_id}', 'total_amount': amount})
+                cache.set(cache_key, payment_url, self.config['SESSION_TTL'])
+            return payment_url
+        finally:
+            cache.delete(lock_key)
+
+    def request_session(self, post_body):
+        if not self.breaker.allow():
+            raise GatewayUnavailable('Payment gateway is unavailable, try again shortly.')
+
+        post_body = {**post_body, 'store_id': self.config['STORE_ID'], 'store_passwd': self.config['STORE_PASSWORD']}
+        try:
+            response = self.http.post(self.base_url + self.session_path, data=post_body, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError):
+            self.breaker.record_failure()
+            raise GatewayUnavailable('Payment gateway is unavailable, try again shortly.')
+
+        if not isinstance(data, dict):
+            self.breaker.record_failure()
+            raise InvalidGatewayResponse('Payment gateway sent an invalid reply.')
+        if data.get('status') != 'SUCCESS':
+            self.breaker.record_success()
+            raise PaymentGatewayError(data.get('failedreason') or 'Payment initiation failed')
+        if not isinstance(data.get('GatewayPageURL'), str) or not data['GatewayPageURL'].startswith(('https://', 'http://')):
+            self.breaker.record_failure()
+            raise InvalidGatewayResponse('Payment gateway sent an invalid reply.')
+
+        self.breaker.record_success()
+        return data['GatewayPageURL']
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = SSLCommerzGateway(settings.SSLCOMMERZ)
+        return _gateway
@@ -0,0 +1,41 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from advertisement.models import Advertisement
+from bookings.models import RentRequest
+
+ALREADY_RENTED = "Your house already rented. You can't update anything for this advertisement now."
+ALREADY_APPROVED = "You already accepted a rent request for this advertisement. Set it back to pending before accepting or rejecting another request."
+
+
+class TransitionError(Exception):
+    pass
+
+
+def set_status(rent_request, status):
+    # the advertisement row lock serializes every status change of its requests, the partial unique
+    # constraint on approved requests is the last line of defence
+    with transaction.atomic():
+        advertisement = Advertisement.objects.select_for_update().only('id', 'is_rented').get(pk=rent_request.advertisement_id)
+        if advertisement.is_rented:
+            raise TransitionError(ALREADY_RENTED)
+
+        requests = RentRequest.objects.filter(advertisement_id=advertisement.pk)
+        if requests.filter(status=RentRequest.APPROVED).exclude(pk=rent_request.pk).exists():
+            raise TransitionError(ALREADY_APPROVED)
+
+        # the chosen request and the knock-on effect on the others in one UPDATE:
+        # approving rejects the pending ones, going back to pending reopens the rejected ones
+        others = {
+            RentRequest.APPROVED: When(status=RentRequest.PENDING, then=Value(RentRequest.REJECTED)),
+            RentRequest.PENDING: When(status=RentRequest.REJECTED, then=Value(RentRequest.PENDING)),
+        }.get(status)
+        try:
+            if others is None:
+                requests.filter(pk=rent_request.pk).update(status=status)
+            else:
+                requests.update(status=Case(When(pk=rent_request.pk, then=Value(status)), others, default=F('status')))
+        except IntegrityError:
+            raise TransitionError(ALREADY_APPROVED)
+
+    rent_request.status = status
+    return rent_request
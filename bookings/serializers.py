@@ -1,7 +1,22 @@
 from bookings.models import RentRequest, Favourite, Order
 from advertisement.models import Advertisement
 from rest_framework import serializers
-from advertisement.serializers import SimpleUserSerializer
+from advertisement.serializers import simple_user_serializer
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+
+
+def create_unique(existing, duplicate_errors, **fields):
+    # the unique constraints settle concurrent requests that both passed validation,
+    # the loser gets the same error the validation would have given
+    try:
+        with transaction.atomic():
+            return existing.model.objects.create(**fields)
+    except IntegrityError:
+        if existing.exists():
+            raise serializers.ValidationError(duplicate_errors)
+        raise
+
 
 class SimpleAdvertisementSerializer(serializers.ModelSerializer):
     class Meta:
@@ -16,7 +31,13 @@ class RentRequestSerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'status']
 
     def get_user(self, obj):
-        return SimpleUserSerializer(obj.user).data
+        return simple_user_serializer.to_representation(obj.user)
+
+class InboxRentRequestSerializer(RentRequestSerializer):
+    advertisement_title = serializers.CharField(source='advertisement.title', read_only=True)
+
+    class Meta(RentRequestSerializer.Meta):
+        fields = ['id', 'advertisement', 'advertisement_title', 'user', 'status', 'created_at']
 
 class UpdateRentRequestSerializer(serializers.ModelSerializer):
     class Meta:
@@ -34,6 +55,8 @@ class UserRequestSerializer(serializers.ModelSerializer):
 
 class UserAddRequestSerializer(serializers.ModelSerializer):
     advertisement_id = serializers.IntegerField()
+    duplicate_message = 'You have already requested for this advertisement'
+
     class Meta:
         model = RentRequest
         fields = ['id', 'status', 'advertisement_id']
@@ -42,15 +65,21 @@ class UserAddRequestSerializer(serializers.ModelSerializer):
     def validate_advertisement_id(self, value):
         if value <= 0:
             raise serializers.ValidationError('Your advertisement Id must be 1 or bigger value')
-        elif not Advertisement.objects.filter(pk=value).exists():
+
+        # everything the checks below need, in one query
+        advertisement = Advertisement.objects.filter(pk=value).annotate(
+            already_requested=Exists(RentRequest.objects.filter(advertisement=OuterRef('pk'), user=self.context['request'].user))
+        ).values('status', 'is_rented', 'owner_id', 'already_requested').first()
+
+        if advertisement is None:
             raise serializers.ValidationError(f'Advertisement with id {value} does not exist')
-        elif not Advertisement.objects.filter(pk=value, status='Approved'):
+        elif advertisement['status'] != Advertisement.APPROVED:
             raise serializers.ValidationError(f'Advertisement with Id {value} is not verified by Admin')
-        elif RentRequest.objects.filter(advertisement_id=value, user=self.context['request'].user).exists():
-            raise serializers.ValidationError('You have already requested for this advertisement')
-        elif Advertisement.objects.filter(pk=value , is_rented=True).exists():
+        elif advertisement['already_requested']:
+            raise serializers.ValidationError(self.duplicate_message)
+        elif advertisement['is_rented']:
             raise serializers.ValidationError("You can't send Rent request. This advertisement is already booked for rent")
-        elif Advertisement.objects.filter(pk=value, owner=self.context['request'].user).exists():
+        elif advertisement['owner_id'] == self.context['request'].user.id:
             raise serializers.ValidationError("This is your advertisement! you can't send rent request")
         
         return value
@@ -59,12 +88,17 @@ class UserAddRequestSerializer(serializers.ModelSerializer):
         advertisement_id = validated_data['advertisement_id']
         user = validated_data['user']
 
-        return RentRequest.objects.create(user=user, advertisement_id=advertisement_id)
+        return create_unique(
+            RentRequest.objects.filter(user=user, advertisement_id=advertisement_id),
+            {'advertisement_id': [self.duplicate_message]},
+            user=user, advertisement_id=advertisement_id
+        )
 
 
 class FavouriteSerializer(serializers.ModelSerializer):
     advertisement_id = serializers.IntegerField(write_only=True)
     advertisement = SimpleAdvertisementSerializer(read_only=True)
+    duplicate_message = 'You have already saved this advertisement in your Favourite list!'
     
     class Meta:
         model = Favourite
@@ -73,12 +107,17 @@ class FavouriteSerializer(serializers.ModelSerializer):
     def validate_advertisement_id(self, value):
         if value < 0:
             raise serializers.ValidationError('Your advertisement Id must be a positive value')
-        elif not Advertisement.objects.filter(pk=value).exists():
+
+        advertisement = Advertisement.objects.filter(pk=value).annotate(
+            already_saved=Exists(Favourite.objects.filter(advertisement=OuterRef('pk'), user=self.context['request'].user))
+        ).values('status', 'already_saved').first()
+
+        if advertisement is None:
             raise serializers.ValidationError(f'Advertisement with id {value} does not exist')
-        elif not Advertisement.objects.filter(pk=value, status='Approved'):
+        elif advertisement['status'] != Advertisement.APPROVED:
             raise serializers.ValidationError(f'Advertisement with Id {value} is not verified by Admin')
-        elif Favourite.objects.filter(advertisement_id=value, user=self.context['request'].user).exists():
-            raise serializers.ValidationError('You have already saved this advertisement in your Favourite list!')
+        elif advertisement['already_saved']:
+            raise serializers.ValidationError(self.duplicate_message)
         
         return value
 
@@ -86,7 +125,11 @@ class FavouriteSerializer(serializers.ModelSerializer):
         advertisement_id = validated_data['advertisement_id']
         user = validated_data['user']
 
-        return Favourite.objects.create(user=user, advertisement_id=advertisement_id)
+        return create_unique(
+            Favourite.objects.filter(user=user, advertisement_id=advertisement_id),
+            {'advertisement_id': [self.duplicate_message]},
+            user=user, advertisement_id=advertisement_id
+        )
 
 
 
@@ -99,19 +142,25 @@ class OrderUpdateSerializer(serializers.ModelSerializer):
 class OrderSerializer(serializers.ModelSerializer):
     advertisement = SimpleAdvertisementSerializer(read_only=True)
     advertisement_id = serializers.IntegerField(write_only=True)
+    duplicate_message = 'You already have an order for this rent advertisement. Check order section.'
+
     class Meta:
         model = Order
         fields = ['id', 'user', 'advertisement_id', 'advertisement', 'status', 'full_name', 'address', 'phone_number', 'payment_date', 'created_at']
         read_only_fields = ['user', 'status', 'payment_date']
 
     def validate_advertisement_id(self, value):
-        if Order.objects.filter(advertisement_id=value, user=self.context['request'].user).exists():
-            raise serializers.ValidationError('You already have an order for this rent advertisement. Check order section.')
+        if Order.objects.active().filter(advertisement_id=value, user=self.context['request'].user).exists():
+            raise serializers.ValidationError(self.duplicate_message)
         
         return value
 
     def create(self, validated_data):
-        return Order.objects.create(**validated_data)
+        return create_unique(
+            Order.objects.active().filter(user=validated_data['user'], advertisement_id=validated_data['advertisement_id']),
+            {'advertisement_id': [self.duplicate_message]},
+            **validated_data
+        )
 
 
 class EmptySerializer(serializers.Serializer):
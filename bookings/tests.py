@@ -1,3 +1,398 @@
-from django.test import TestCase
+import threading
+import time
+from http.server import ThreadingHTTPServer
+from datetime import timedelta
+from decimal import Decimal
+from uuid import uuid4
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.db import IntegrityError, connection, connections, transaction
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+from advertisement.models import Advertisement, Category
+from bookings import payments, rent_requests
+from bookings.expiry import expire_unpaid_orders
+from bookings.management.commands.fake_payment_gateway import GatewayHandler
+from bookings.models import Favourite, Order, PaymentCallback, RentRequest
+from bookings.serializers import FavouriteSerializer, OrderSerializer, UserAddRequestSerializer
+from users.models import User
 
-# Create your tests here.
+
+def create_listing(owner, category, **fields):
+    fields = {'status': Advertisement.APPROVED, **fields}
+    return Advertisement.objects.create(
+        title='Flat', description='-', owner=owner, category=category,
+        rental_amount=Decimal('1000'), location='Dhanmondi', bedroom=1, bathroom=1, apartment_size=Decimal('100'), **fields
+    )
+
+
+class RentRequestFixtureMixin:
+    def create_requests(self, count):
+        self.owner = User.objects.create_user('owner@example.com')
+        self.advertisement = create_listing(self.owner, Category.objects.create(name='Flat'))
+        users = [User.objects.create_user(f'tenant{number}@example.com') for number in range(count)]
+        return [RentRequest.objects.create(advertisement=self.advertisement, user=user) for user in users]
+
+    def statuses(self, requests):
+        return [RentRequest.objects.get(pk=rent_request.pk).status for rent_request in requests]
+
+
+class RentRequestTransitionTests(RentRequestFixtureMixin, TestCase):
+    def setUp(self):
+        self.requests = self.create_requests(3)
+
+    def test_approving_rejects_the_pending_requests(self):
+        rent_requests.set_status(self.requests[0], RentRequest.APPROVED)
+        self.assertEqual(self.statuses(self.requests), [RentRequest.APPROVED, RentRequest.REJECTED, RentRequest.REJECTED])
+
+    def test_rejecting_leaves_the_other_requests_alone(self):
+        rent_requests.set_status(self.requests[1], RentRequest.REJECTED)
+        self.assertEqual(self.statuses(self.requests), [RentRequest.PENDING, RentRequest.REJECTED, RentRequest.PENDING])
+
+    def test_approving_again_is_allowed(self):
+        rent_requests.set_status(self.requests[0], RentRequest.APPROVED)
+        rent_requests.set_status(self.requests[0], RentRequest.APPROVED)
+        self.assertEqual(self.statuses(self.requests)[0], RentRequest.APPROVED)
+
+    def test_back_to_pending_reopens_the_rejected_requests(self):
+        rent_requests.set_status(self.requests[0], RentRequest.APPROVED)
+        rent_requests.set_status(self.requests[0], RentRequest.PENDING)
+        self.assertEqual(self.statuses(self.requests), [RentRequest.PENDING] * 3)
+
+    def test_second_approval_is_refused(self):
+        rent_requests.set_status(self.requests[0], RentRequest.APPROVED)
+        with self.assertRaisesMessage(rent_requests.TransitionError, rent_requests.ALREADY_APPROVED):
+            rent_requests.set_status(self.requests[1], RentRequest.APPROVED)
+        self.assertEqual(self.statuses(self.requests), [RentRequest.APPROVED, RentRequest.REJECTED, RentRequest.REJECTED])
+
+    def test_rejecting_another_request_while_one_is_approved_is_refused(self):
+        rent_requests.set_status(self.requests[0], RentRequest.APPROVED)
+        with self.assertRaisesMessage(rent_requests.TransitionError, rent_requests.ALREADY_APPROVED):
+            rent_requests.set_status(self.requests[1], RentRequest.PENDING)
+
+    def test_rented_advertisement_is_refused(self):
+        Advertisement.objects.filter(pk=self.advertisement.pk).update(is_rented=True)
+        with self.assertRaisesMessage(rent_requests.TransitionError, rent_requests.ALREADY_RENTED):
+            rent_requests.set_status(self.requests[0], RentRequest.APPROVED)
+        self.assertEqual(self.statuses(self.requests), [RentRequest.PENDING] * 3)
+
+    def test_refused_update_is_forbidden(self):
+        rent_requests.set_status(self.requests[0], RentRequest.APPROVED)
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        response = client.patch(
+            f'/api/v1/my_advertisements/{self.advertisement.pk}/rent_requests/{self.requests[1].pk}/',
+            {'status': RentRequest.APPROVED}, format='json'
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.statuses(self.requests)[1], RentRequest.REJECTED)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'row locks are only meaningful on PostgreSQL')
+class RentRequestRaceTests(RentRequestFixtureMixin, TransactionTestCase):
+    threads = 8
+
+    def race(self, requests):
+        barrier = threading.Barrier(len(requests))
+        outcomes = []
+
+        def approve(rent_request):
+            try:
+                barrier.wait()
+                rent_requests.set_status(rent_request, RentRequest.APPROVED)
+                outcomes.append('approved')
+            except rent_requests.TransitionError:
+                outcomes.append('refused')
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=approve, args=(rent_request,)) for rent_request in requests]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return outcomes
+
+    def test_one_of_many_concurrent_approvals_wins(self):
+        requests = self.create_requests(self.threads)
+        outcomes = self.race(requests)
+        self.assertEqual(outcomes.count('approved'), 1)
+        self.assertEqual(outcomes.count('refused'), self.threads - 1)
+        self.assertEqual(sorted(self.statuses(requests)), [RentRequest.APPROVED] + [RentRequest.REJECTED] * (self.threads - 1))
+
+    def test_concurrent_approvals_of_the_same_request(self):
+        requests = self.create_requests(3)
+        outcomes = self.race([RentRequest.objects.get(pk=requests[0].pk) for _ in range(self.threads)])
+        self.assertEqual(outcomes, ['approved'] * self.threads)
+        self.assertEqual(self.statuses(requests), [RentRequest.APPROVED, RentRequest.REJECTED, RentRequest.REJECTED])
+
+
+class PaymentCallbackTests(TestCase):
+    def setUp(self):
+        tenant = User.objects.create_user('tenant@example.com')
+        owner = User.objects.create_user('owner@example.com')
+        self.advertisement = create_listing(owner, Category.objects.create(name='Flat'))
+        self.order = Order.objects.create(user=tenant, advertisement=self.advertisement, full_name='Tenant', address='Dhaka', phone_number='01700000000')
+        self.client = APIClient()
+
+    def post_callback(self, tran_id, **fields):
+        return self.client.post('/api/v1/payment/success/', {'tran_id': tran_id, 'amount': '1000.00', 'status': 'VALID', **fields})
+
+    def test_callback_books_the_order(self):
+        response = self.post_callback(f'tnx_{self.order.pk}')
+        self.assertTrue(response['Location'].endswith('/payment/success'))
+        self.order.refresh_from_db()
+        self.advertisement.refresh_from_db()
+        self.assertEqual(self.order.status, Order.BOOKED)
+        self.assertTrue(self.advertisement.is_rented)
+
+    def test_repeated_callback_is_recorded_once(self):
+        self.post_callback(f'tnx_{self.order.pk}')
+        response = self.post_callback(f'tnx_{self.order.pk}')
+        self.assertTrue(response['Location'].endswith('/payment/success'))
+        self.assertEqual(PaymentCallback.objects.get().status, PaymentCallback.PROCESSED)
+
+    def test_unknown_transaction_fails(self):
+        response = self.post_callback(f'tnx_{uuid4()}')
+        self.assertTrue(response['Location'].endswith('/payment/fail'))
+        self.assertEqual(PaymentCallback.objects.get().status, PaymentCallback.FAILED)
+
+    def test_payment_for_cancelled_order_is_due_a_refund(self):
+        Order.objects.filter(pk=self.order.pk).update(status=Order.CANCELLED)
+        with self.assertLogs('bookings.callbacks', 'ERROR'):
+            response = self.post_callback(f'tnx_{self.order.pk}')
+        self.assertTrue(response['Location'].endswith('/payment/fail'))
+        self.assertEqual(PaymentCallback.objects.get().status, PaymentCallback.REFUND_DUE)
+
+    def test_payment_for_an_advertisement_rented_by_another_order_is_due_a_refund(self):
+        other = Order.objects.create(
+            user=User.objects.create_user('other@example.com'), advertisement=self.advertisement,
+            full_name='Other', address='Dhaka', phone_number='01700000001'
+        )
+        self.post_callback(f'tnx_{other.pk}')
+        with self.assertLogs('bookings.callbacks', 'ERROR'):
+            response = self.post_callback(f'tnx_{self.order.pk}')
+        self.assertTrue(response['Location'].endswith('/payment/fail'))
+        self.assertEqual(PaymentCallback.objects.get(tran_id=f'tnx_{self.order.pk}').status, PaymentCallback.REFUND_DUE)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.NOT_PAID)
+
+    def test_payment_of_another_amount_is_due_a_refund(self):
+        with self.assertLogs('bookings.callbacks', 'ERROR'):
+            response = self.post_callback(f'tnx_{self.order.pk}', amount='1.00')
+        self.assertTrue(response['Location'].endswith('/payment/fail'))
+        self.assertEqual(PaymentCallback.objects.get().status, PaymentCallback.REFUND_DUE)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.NOT_PAID)
+
+    def test_callback_without_a_paid_status_does_not_book(self):
+        for status in ['FAILED', '']:
+            with self.subTest(status):
+                PaymentCallback.objects.all().delete()
+                response = self.post_callback(f'tnx_{self.order.pk}', status=status)
+                self.assertTrue(response['Location'].endswith('/payment/fail'))
+                self.assertEqual(PaymentCallback.objects.get().status, PaymentCallback.FAILED)
+                self.order.refresh_from_db()
+                self.assertEqual(self.order.status, Order.NOT_PAID)
+
+
+@mock.patch.object(payments.SSLCommerzGateway, 'request_session', return_value='https://pay.example.com/session')
+class PaymentInitiateTests(TestCase):
+    def setUp(self):
+        self.tenant = User.objects.create_user('tenant@example.com')
+        owner = User.objects.create_user('owner@example.com')
+        self.advertisement = create_listing(owner, Category.objects.create(name='Flat'))
+        self.order = Order.objects.create(user=self.tenant, advertisement=self.advertisement, full_name='Tenant', address='Dhaka', phone_number='01700000000')
+        self.client = APIClient()
+        self.client.force_authenticate(self.tenant)
+
+    def initiate(self):
+        return self.client.post('/api/v1/payment/initiate/', {'orderId': str(self.order.pk)})
+
+    def test_payment_is_started_at_the_stored_rent(self, request_session):
+        response = self.initiate()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['payment_url'], 'https://pay.example.com/session')
+        self.assertEqual(request_session.call_args.args[0]['total_amount'], self.advertisement.rental_amount)
+        self.order.refresh_from_db()
+        self.assertIsNotNone(self.order.payment_started_at)
+
+    def test_gateway_is_called_after_the_commit(self, request_session):
+        # the test case itself runs in transactions, the view may not add one around the gateway call
+        depth = len(connection.atomic_blocks)
+        request_session.side_effect = lambda post_body: len(connection.atomic_blocks) == depth and 'https://pay.example.com/session'
+        self.assertEqual(self.initiate().data['payment_url'], 'https://pay.example.com/session')
+
+    def test_rented_advertisement_can_not_be_paid(self, request_session):
+        Advertisement.objects.filter(pk=self.advertisement.pk).update(is_rented=True)
+        response = self.initiate()
+        self.assertEqual(response.status_code, 400)
+        request_session.assert_not_called()
+
+    def test_cancelled_order_can_not_be_paid(self, request_session):
+        Order.objects.filter(pk=self.order.pk).update(status=Order.CANCELLED)
+        response = self.initiate()
+        self.assertEqual(response.status_code, 400)
+        request_session.assert_not_called()
+
+    def test_unpaid_order_sweep_waits_for_a_started_payment(self, request_session):
+        max_age = 60
+        Order.objects.filter(pk=self.order.pk).update(created_at=timezone.now() - timedelta(seconds=max_age * 2))
+        self.initiate()
+        self.assertEqual(expire_unpaid_orders(max_age), (0, 0))
+
+        # once the gateway session has run out the order is swept like any other
+        started_at = timezone.now() - timedelta(seconds=settings.SSLCOMMERZ['SESSION_TTL'] + 1)
+        Order.objects.filter(pk=self.order.pk).update(payment_started_at=started_at)
+        self.assertEqual(expire_unpaid_orders(max_age), (1, 1))
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, Order.CANCELLED)
+
+
+class UniqueConstraintTests(TestCase):
+    def setUp(self):
+        self.tenant = User.objects.create_user('tenant@example.com')
+        self.owner = User.objects.create_user('owner@example.com')
+        self.category = Category.objects.create(name='Flat')
+        self.advertisement = create_listing(self.owner, self.category)
+        self.client = APIClient()
+        self.client.force_authenticate(self.tenant)
+
+    def assertRefusedByDatabase(self, model, **fields):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            model.objects.create(**fields)
+
+    def test_one_rent_request_favourite_and_active_order_per_user(self):
+        RentRequest.objects.create(advertisement=self.advertisement, user=self.tenant)
+        Favourite.objects.create(advertisement=self.advertisement, user=self.tenant)
+        order = Order.objects.create(advertisement=self.advertisement, user=self.tenant, full_name='Tenant', address='Dhaka', phone_number='01700000000')
+
+        self.assertRefusedByDatabase(RentRequest, advertisement=self.advertisement, user=self.tenant)
+        self.assertRefusedByDatabase(Favourite, advertisement=self.advertisement, user=self.tenant)
+        self.assertRefusedByDatabase(Order, advertisement=self.advertisement, user=self.tenant, full_name='Tenant', address='Dhaka', phone_number='01700000000')
+
+        # a cancelled order does not count
+        Order.objects.filter(pk=order.pk).update(status=Order.CANCELLED)
+        Order.objects.create(advertisement=self.advertisement, user=self.tenant, full_name='Tenant', address='Dhaka', phone_number='01700000000')
+
+    def test_one_approved_rent_request_per_advertisement(self):
+        RentRequest.objects.create(advertisement=self.advertisement, user=self.tenant, status=RentRequest.APPROVED)
+        other = User.objects.create_user('other@example.com')
+        self.assertRefusedByDatabase(RentRequest, advertisement=self.advertisement, user=other, status=RentRequest.APPROVED)
+        RentRequest.objects.create(advertisement=self.advertisement, user=other)
+
+    def test_duplicates_get_the_validation_message(self):
+        order = {'full_name': 'Tenant', 'address': 'Dhaka', 'phone_number': '01700000000'}
+        for url, message, data in [
+            ('/api/v1/my_rent_requests/', UserAddRequestSerializer.duplicate_message, {}),
+            ('/api/v1/favourites/', FavouriteSerializer.duplicate_message, {}),
+            ('/api/v1/orders/', OrderSerializer.duplicate_message, order),
+        ]:
+            with self.subTest(url):
+                data = {'advertisement_id': self.advertisement.pk, **data}
+                self.assertEqual(self.client.post(url, data).status_code, 201)
+                response = self.client.post(url, data)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(message, str(response.data))
+
+    def test_concurrent_duplicate_gets_the_validation_message(self):
+        # validation passed for both requests, the other one was created first
+        serializer = UserAddRequestSerializer(context={'request': mock.Mock(user=self.tenant)})
+        RentRequest.objects.create(advertisement=self.advertisement, user=self.tenant)
+        with self.assertRaisesMessage(ValidationError, UserAddRequestSerializer.duplicate_message):
+            serializer.create({'advertisement_id': self.advertisement.pk, 'user': self.tenant})
+        self.assertEqual(RentRequest.objects.count(), 1)
+
+    def test_rent_request_is_validated_in_one_query(self):
+        serializer = UserAddRequestSerializer(context={'request': mock.Mock(user=self.tenant)})
+        with self.assertNumQueries(1):
+            self.assertEqual(serializer.validate_advertisement_id(self.advertisement.pk), self.advertisement.pk)
+
+    def test_rent_requests_that_can_not_be_sent(self):
+        pending = create_listing(self.owner, self.category, status=Advertisement.PENDING)
+        rented = create_listing(self.owner, self.category, is_rented=True)
+        own = create_listing(self.tenant, self.category)
+        for advertisement_id in [pending.pk, rented.pk, own.pk, own.pk + 100]:
+            with self.subTest(advertisement_id):
+                response = self.client.post('/api/v1/my_rent_requests/', {'advertisement_id': advertisement_id})
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(RentRequest.objects.exists())
+
+
+class CountingGatewayHandler(GatewayHandler):
+    session_requests = 0
+
+    def do_POST(self):
+        type(self).session_requests += 1
+        super().do_POST()
+
+
+class GatewayCircuitBreakerTests(SimpleTestCase):
+    recovery_time = 0.2
+
+    def setUp(self):
+        cache.clear()
+        handler = type('Handler', (CountingGatewayHandler,), {'failure_rate': 1})
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.handler = handler
+        self.gateway = payments.SSLCommerzGateway({
+            **settings.SSLCOMMERZ,
+            'API_URL': f'http://127.0.0.1:{self.server.server_port}',
+            'CONNECT_RETRIES': 0,
+            'FAILURE_THRESHOLD': 2,
+            'RECOVERY_TIME': self.recovery_time,
+        })
+
+    def create_session(self, order_id):
+        return self.gateway.create_session(order_id, '1000.00', {'success_url': 'http://testserver/success/'})
+
+    def test_opens_after_failures_and_closes_after_a_trial_call(self):
+        for order_id in range(2):
+            with self.assertRaises(payments.GatewayUnavailable):
+                self.create_session(order_id)
+        self.assertEqual(self.handler.session_requests, 2)
+
+        # open: fails fast without reaching the gateway, even once it is back
+        self.handler.failure_rate = 0
+        with self.assertRaises(payments.GatewayUnavailable):
+            self.create_session(2)
+        self.assertEqual(self.handler.session_requests, 2)
+
+        time.sleep(self.recovery_time)
+        self.assertTrue(self.create_session(3).startswith('http://'))
+        self.assertIsNotNone(self.create_session(4))
+        self.assertEqual(self.handler.session_requests, 4)
+
+    def test_failed_trial_call_opens_it_again(self):
+        for order_id in range(2):
+            with self.assertRaises(payments.GatewayUnavailable):
+                self.create_session(order_id)
+
+        time.sleep(self.recovery_time)
+        with self.assertRaises(payments.GatewayUnavailable):
+            self.create_session(2)
+        self.handler.failure_rate = 0
+        with self.assertRaises(payments.GatewayUnavailable):
+            self.create_session(3)
+        self.assertEqual(self.handler.session_requests, 3)
+
+    def test_session_is_reused_for_the_same_order(self):
+        self.handler.failure_rate = 0
+        payment_url = self.create_session(1)
+        self.assertEqual(self.create_session(1), payment_url)
+        self.assertNotEqual(self.create_session(2), payment_url)
+        self.assertEqual(self.handler.session_requests, 2)
+
+    def test_payment_already_being_started(self):
+        cache.add(f'{self.gateway.session_key(1)}:lock', 1)
+        with self.assertRaises(payments.PaymentInProgress):
+            self.create_session(1)
+        self.assertEqual(self.handler.session_requests, 0)
@@ -0,0 +1,18 @@
+from bookings.models import Favourite, Order, RentRequest
+
+
+def get_user_states(user, advertisement_ids):
+    # one query per relation for the whole page, instead of three requests per listing card
+    favourites = set(Favourite.objects.filter(user=user, advertisement_id__in=advertisement_ids).values_list('advertisement_id', flat=True))
+    rent_requests = dict(RentRequest.objects.filter(user=user, advertisement_id__in=advertisement_ids).values_list('advertisement_id', 'status'))
+    rented = set(Order.objects.filter(user=user, advertisement_id__in=advertisement_ids, status=Order.BOOKED).values_list('advertisement_id', flat=True))
+
+    return [
+        {
+            'advertisement_id': advertisement_id,
+            'is_favourite': advertisement_id in favourites,
+            'rent_request_status': rent_requests.get(advertisement_id),
+            'has_rented': advertisement_id in rented,
+        }
+        for advertisement_id in advertisement_ids
+    ]
@@ -1,15 +1,20 @@
-from bookings.models import RentRequest, Favourite, Order
+from bookings.models import RentRequest, Favourite, Order, PaymentCallback
 from bookings.serializers import RentRequestSerializer, UserRequestSerializer, UserAddRequestSerializer, UpdateRentRequestSerializer, FavouriteSerializer, OrderSerializer, OrderUpdateSerializer, EmptySerializer
 from rest_framework import viewsets, exceptions, response, status
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from api.permissions import IsAdvertisementOwnerOrReadOnly
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework.decorators import action, api_view
-from sslcommerz_lib import SSLCOMMERZ
+from bookings import callbacks, payments
 from django.conf import settings as main_settings
+from django.db import transaction
 from django.shortcuts import redirect
 from django.utils import timezone
+from uuid import UUID
 from rest_framework.views import APIView
+from advertisement.paginations import UserListingPagination
+from api.fieldsets import SparseFieldsetMixin
+from bookings import rent_requests
 
 
 class RentRequestViewSet(viewsets.ModelViewSet):
@@ -22,24 +27,13 @@ class RentRequestViewSet(viewsets.ModelViewSet):
         return UpdateRentRequestSerializer
         
     def get_queryset(self):
-        return RentRequest.objects.filter(advertisement_id=self.kwargs.get('my_advertisement_pk'))
+        return RentRequest.objects.select_related('user').filter(advertisement_id=self.kwargs.get('my_advertisement_pk'))
     
     def perform_update(self, serializer):
-        # checking any request is approved or not
-        rent_request = self.get_object()
-        if rent_request.advertisement.is_rented == True:
-            raise exceptions.PermissionDenied("Your house already rented. You can't update anything for this advertisement now.")
-        
-        # update
-        rent_request = serializer.save()
-        advertisement = rent_request.advertisement
-
-        # if one approved then others will be rejected
-        if rent_request.status == RentRequest.APPROVED:
-            RentRequest.objects.filter(advertisement=advertisement, status=RentRequest.PENDING).exclude(id=rent_request.id).update(status=RentRequest.REJECTED)
-        # if approved one is pending then others rejected will comes to pending
-        elif rent_request.status == RentRequest.PENDING:
-            RentRequest.objects.filter(advertisement=advertisement, status=RentRequest.REJECTED).exclude(id=rent_request.id).update(status=RentRequest.PENDING)
+        try:
+            rent_requests.set_status(serializer.instance, serializer.validated_data.get('status', serializer.instance.status))
+        except rent_requests.TransitionError as error:
+            raise exceptions.PermissionDenied(str(error))
         
 
     @swagger_auto_schema(
@@ -66,6 +60,7 @@ class RentRequestViewSet(viewsets.ModelViewSet):
 class MyRentRequestViewSet(viewsets.ModelViewSet):
     http_method_names = ['get', 'post', 'delete', 'head', 'options']
     permission_classes = [IsAuthenticated]
+    pagination_class = UserListingPagination
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -109,7 +104,7 @@ class MyRentRequestViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class FavouriteViewSet(viewsets.ModelViewSet):
+class FavouriteViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     http_method_names = ['get', 'post', 'delete', 'head', 'options']
     permission_classes = [IsAuthenticated]
 
@@ -120,7 +115,7 @@ class FavouriteViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         if getattr(self, 'swagger_fake_view', False):
             return Favourite.objects.none
-        return Favourite.objects.filter(user=self.request.user)
+        return Favourite.objects.select_related('advertisement').filter(user=self.request.user)
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -154,8 +149,9 @@ class FavouriteViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
     
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     http_method_names = ['get', 'post', 'patch', 'delete', 'head', 'options']
+    pagination_class = UserListingPagination
 
     def get_queryset(self):
         if self.request.user.is_staff:
@@ -193,23 +189,25 @@ class OrderViewSet(viewsets.ModelViewSet):
 
 
 # Payment functionalities
+def is_valid_uuid(value):
+    try:
+        UUID(str(value))
+    except ValueError:
+        return False
+    return True
+
+
 @api_view(['POST'])
 def payment_initiate(request):
     
     user = request.user
-    amount = request.data.get('amount')
     order_id = request.data.get('orderId')
     name = request.data.get('full_name')
     address = request.data.get('address')
     phone_number = request.data.get('phone_number')
 
-
-    settings = { 'store_id': 'phima680e1d98b5158', 'store_pass': 'phima680e1d98b5158@ssl', 'issandbox': True }
-    sslcz = SSLCOMMERZ(settings)
     post_body = {}
-    post_body['total_amount'] = amount
     post_body['currency'] = "BDT"
-    post_body['tran_id'] = f"tnx_{order_id}"
     post_body['success_url'] = f"{main_settings.BACKEND_URL}/api/v1/payment/success/"
     post_body['fail_url'] = f"{main_settings.BACKEND_URL}/api/v1/payment/fail/"
     post_body['cancel_url'] = f"{main_settings.BACKEND_URL}/api/v1/payment/cancel/"
@@ -227,30 +225,47 @@ def payment_initiate(request):
     post_body['product_category'] = "General"
     post_body['product_profile'] = "general"
 
-
-    responseData = sslcz.createSession(post_body) # API response
-    
-    if(responseData.get('status') == 'SUCCESS'):
-        return response.Response({'payment_url': responseData['GatewayPageURL']})
-    return response.Response({'error': 'Payment initiation failed'}, status=status.HTTP_400_BAD_REQUEST)
+    # only the checks and the start of the payment run under the row lock, the gateway call comes after the commit
+    with transaction.atomic():
+        order = Order.objects.select_for_update(of=('self',)).select_related('advertisement').filter(id=order_id, user=user).first() if is_valid_uuid(order_id) else None
+        if order is None:
+            return response.Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
+        if order.status != Order.NOT_PAID:
+            return response.Response({'error': f'This order is {order.status.lower()}, it can not be paid'}, status=status.HTTP_400_BAD_REQUEST)
+        if order.advertisement.is_rented:
+            return response.Response({'error': 'This house is already rented'}, status=status.HTTP_400_BAD_REQUEST)
+        # keeps the unpaid order sweeper away while the gateway session can still be paid
+        order.payment_started_at = timezone.now()
+        order.save(update_fields=['payment_started_at'])
+
+    try:
+        # the rent is charged as stored, never an amount sent by the client
+        payment_url = payments.get_gateway().create_session(order.id, order.advertisement.rental_amount, post_body)
+    except payments.PaymentInProgress as error:
+        return response.Response({'error': str(error)}, status=status.HTTP_409_CONFLICT)
+    except payments.GatewayUnavailable as error:
+        return response.Response({'error': str(error)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    except payments.InvalidGatewayResponse as error:
+        return response.Response({'error': str(error)}, status=status.HTTP_502_BAD_GATEWAY)
+    except payments.PaymentGatewayError:
+        return response.Response({'error': 'Payment initiation failed'}, status=status.HTTP_400_BAD_REQUEST)
+
+    return response.Response({'payment_url': payment_url})
 
 
 # success
 @api_view(['POST'])
 def payment_success(request):
-    order_id = request.data.get('tran_id').split('_')[1]
-    order = Order.objects.get(id=order_id)
-    # updating advertisement as rented
-    order.advertisement.is_rented = True
-    order.advertisement.save();
-    # updating order status to booked
-    order.status = 'Booked'
-    # setting the payment date
-    order.payment_date = timezone.now()
-    # finally save the order
-    order.save()
-
-    return redirect(f'{main_settings.FRONTEND_URL}/payment/success')
+    # recorded first so nothing is lost, then booked right away; `manage.py process_payment_callbacks` retries what is left pending
+    tran_id = callbacks.record(request.data)
+    if tran_id is None:
+        return redirect(f'{main_settings.FRONTEND_URL}/payment/fail')
+
+    outcome = callbacks.process(tran_id)
+    # still pending (a worker holds it, or a retry is due) only counts as a success for a real order
+    if outcome == PaymentCallback.PROCESSED or outcome in (PaymentCallback.PENDING, None) and Order.objects.filter(pk=callbacks.parse_order_id(tran_id)).exists():
+        return redirect(f'{main_settings.FRONTEND_URL}/payment/success')
+    return redirect(f'{main_settings.FRONTEND_URL}/payment/fail')
 
 # fail
 @api_view(['POST'])
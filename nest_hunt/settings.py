@@ -31,6 +31,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     "corsheaders",
     'drf_yasg',
     'rest_framework',
@@ -94,6 +95,22 @@ DATABASES = {
     }
 }
 
+# Use a shared backend (e.g. redis) in production so cache invalidation reaches every worker
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='nest-hunt'),
+    }
+}
+
+FACETS_CACHE_TIMEOUT = 60 * 15
+RESPONSE_CACHE_TIMEOUT = 60 * 5
+DASHBOARD_STATISTICS_TIMEOUT = 60 * 5
+# seconds before a worker rebuilds its in-process location/category suggestion index
+TYPEAHEAD_MAX_AGE = 60 * 10
+# same for the per category feature vectors behind the similar listings endpoint
+SIMILAR_LISTINGS_MAX_AGE = 60 * 10
+
 # Cloudinary configuration for files/images
 cloudinary.config( 
     cloud_name = config('cloud_name'), 
@@ -210,4 +227,27 @@ SWAGGER_SETTINGS = {
 
 
 FRONTEND_URL = config('FRONTEND_URL')
-BACKEND_URL = config('BACKEND_URL')
\ No newline at end of file
+BACKEND_URL = config('BACKEND_URL')
+
+SSLCOMMERZ = {
+    # both come from the environment, like the database and Cloudinary credentials
+    'STORE_ID': config('SSLCOMMERZ_STORE_ID'),
+    'STORE_PASSWORD': config('SSLCOMMERZ_STORE_PASSWORD'),
+    'SANDBOX': config('SSLCOMMERZ_SANDBOX', default=True, cast=bool),
+    # e.g. http://127.0.0.1:8765 for `manage.py fake_payment_gateway`
+    'API_URL': config('SSLCOMMERZ_API_URL', default=''),
+    'CONNECT_TIMEOUT': 3,
+    'READ_TIMEOUT': 10,
+    'CONNECT_RETRIES': 2,
+    'POOL_SIZE': 20,
+    'FAILURE_THRESHOLD': 5,
+    'RECOVERY_TIME': 30,
+    # how long a created gateway session is reused for retries of the same order
+    'SESSION_TTL': 60 * 20,
+}
+
+# Vercel cron sends it as `Authorization: Bearer <CRON_SECRET>` to the scheduled jobs endpoint, unset disables the endpoint
+CRON_SECRET = config('CRON_SECRET', default='')
+
+# seconds before `manage.py expire_unpaid_orders` cancels an order that was never paid
+UNPAID_ORDER_MAX_AGE = config('UNPAID_ORDER_MAX_AGE', default=60 * 60 * 48, cast=int)
\ No newline at end of file
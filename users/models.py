@@ -16,5 +16,10 @@ class User(AbstractUser):
 
     objects = CustomUserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['date_joined'], name='user_date_joined_idx'),
+        ]
+
     def __str__(self):
         return self.email
\ No newline at end of file
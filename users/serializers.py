@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from datetime import timedelta
+from django.utils.timezone import now
 from advertisement.models import Advertisement
 from djoser.serializers import UserCreateSerializer as BaseUserCreateSerializer, UserSerializer as BaseUserSerializer
 from advertisement.serializers import AdvertisementImageSerializer
@@ -8,7 +10,7 @@ class MyAdvertisementSerializer(serializers.ModelSerializer):
     images = AdvertisementImageSerializer(many=True, read_only=True)
     class Meta:
         model = Advertisement
-        fields = ['id', 'title', 'description', 'category', 'status', 'location', 'bedroom', 'bathroom', 'rental_amount', 'apartment_size', 'images']
+        fields = ['id', 'title', 'description', 'category', 'status', 'location', 'latitude', 'longitude', 'bedroom', 'bathroom', 'rental_amount', 'apartment_size', 'images']
         read_only_fields = ['status', 'category']
 
 
@@ -22,4 +24,15 @@ class UserSerializer(BaseUserSerializer):
     class Meta(BaseUserSerializer.Meta):
         ref_name = 'CustomUser'
         fields = ['id', 'email', 'first_name', 'last_name', 'address', 'phone_number', 'profile_image', 'is_staff', 'last_login', 'date_joined']
-        read_only_fields = ['is_staff']
\ No newline at end of file
+        read_only_fields = ['is_staff']
+
+class DashboardRangeSerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        end = attrs.get('end') or now().date()
+        start = attrs.get('start') or end - timedelta(days=29)
+        if start > end:
+            raise serializers.ValidationError({'start': 'Start must not be after end.'})
+        return {'start': start, 'end': end}
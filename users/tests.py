@@ -1,3 +1,70 @@
+from decimal import Decimal
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from advertisement.models import Advertisement, Category
+from bookings.models import RentRequest
+from users.models import User
 
-# Create your tests here.
+
+class RentRequestInboxTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user('owner@example.com')
+        category = Category.objects.create(name='Flat')
+        self.flat, self.house, other = [
+            Advertisement.objects.create(
+                title=title, description='-', owner=owner, category=category, status=Advertisement.APPROVED,
+                rental_amount=Decimal('1000'), location='Dhanmondi', bedroom=1, bathroom=1, apartment_size=Decimal('100')
+            )
+            for title, owner in [('Flat', self.owner), ('House', self.owner), ('Other', User.objects.create_user('other@example.com'))]
+        ]
+        tenants = [User.objects.create_user(f'tenant{number}@example.com') for number in range(7)]
+        for advertisement in (self.flat, self.house, other):
+            for tenant in tenants:
+                RentRequest.objects.create(advertisement=advertisement, user=tenant)
+        RentRequest.objects.filter(advertisement=self.house, user__in=tenants[:3]).update(status=RentRequest.REJECTED)
+        # every request arrived at the same moment, the id breaks the tie
+        RentRequest.objects.update(created_at=timezone.now())
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def walk(self, params=None):
+        response = self.client.get('/api/v1/my_advertisements/inbox/', params)
+        self.assertEqual(response.status_code, 200)
+        pages = [response.data]
+        while pages[-1]['next']:
+            pages.append(self.client.get(pages[-1]['next']).data)
+        return pages
+
+    def test_newest_first_over_every_page(self):
+        pages = self.walk()
+        self.assertEqual(len(pages), 2)
+        ids = [rent_request['id'] for page in pages for rent_request in page['results']]
+        expected = RentRequest.objects.filter(advertisement__owner=self.owner).order_by('-created_at', '-id')
+        self.assertEqual(ids, [str(pk) for pk in expected.values_list('id', flat=True)])
+
+        # and back again from the last page
+        previous = self.client.get(pages[-1]['previous']).data
+        self.assertEqual(previous['results'], pages[0]['results'])
+
+    def test_filtered_by_status_and_advertisement(self):
+        pages = self.walk({'status': RentRequest.PENDING, 'advertisement': self.house.pk})
+        self.assertEqual(len(pages), 1)
+        self.assertEqual(len(pages[0]['results']), 4)
+        self.assertEqual({rent_request['advertisement_title'] for rent_request in pages[0]['results']}, {'House'})
+
+    def test_pending_counts_cover_every_advertisement(self):
+        data = self.walk({'advertisement': self.house.pk})[0]
+        self.assertEqual(
+            sorted(data['pending_counts'], key=lambda row: row['advertisement']),
+            [
+                {'advertisement': self.flat.pk, 'title': 'Flat', 'pending': 7},
+                {'advertisement': self.house.pk, 'title': 'House', 'pending': 4},
+            ]
+        )
+
+    def test_invalid_filter(self):
+        self.assertEqual(self.client.get('/api/v1/my_advertisements/inbox/', {'status': 'Unknown'}).status_code, 400)
+
+    def test_login_required(self):
+        self.assertEqual(APIClient().get('/api/v1/my_advertisements/inbox/').status_code, 401)
@@ -1,11 +1,16 @@
-from users.serializers import MyAdvertisementSerializer
-from rest_framework import viewsets, permissions, status, exceptions
-from advertisement.models import Advertisement
+from users.serializers import MyAdvertisementSerializer, DashboardRangeSerializer
+from rest_framework import viewsets, mixins, permissions, status, exceptions
+from rest_framework.decorators import action
+from advertisement.models import Advertisement, Category
 from rest_framework.response import Response
-from django.utils.timezone import now
+from django.utils.timezone import localdate
 from datetime import timedelta
 from users.models import User
-from django.db.models import Count, Q
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+from django.conf import settings
+from django.core.cache import cache
+from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg.utils import swagger_auto_schema
 from djoser.views import UserViewSet
 from django.contrib.auth.hashers import check_password
@@ -13,6 +18,17 @@ from advertisement.serializers import AdvertisementSerializer
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 import requests
+from advertisement import caching
+from api import statistics
+from advertisement.fast_serializers import FastListMixin
+from advertisement.filter import ModerationFilter
+from advertisement.paginations import AdvertisementPagination, KeysetPagination
+from bookings.filter import RentRequestFilter
+from bookings.models import PaymentCallback, RentRequest
+from bookings.serializers import InboxRentRequestSerializer
+from advertisement.search import AdvertisementSearchFilter
+
+DASHBOARD_USERS_KEY = 'dashboard:total-users'
 
 
 class MyAdvertisementViewSet(viewsets.ModelViewSet):
@@ -52,30 +68,101 @@ class MyAdvertisementViewSet(viewsets.ModelViewSet):
     )
     def destroy(self, request, *args, **kwargs):
         return super().destroy(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_summary='Get the rent requests for all advertisements of the owner',
+        operation_description='Only advertisement owner can get the rent requests sent for any of their advertisements, newest first with cursor pagination, filtered by `status` and `advertisement`, together with the number of pending requests per advertisement'
+    )
+    @action(detail=False, methods=['get'])
+    def inbox(self, request):
+        rent_requests = RentRequest.objects.filter(advertisement__owner=request.user)
+        filterset = RentRequestFilter(request.query_params, queryset=rent_requests.select_related('user', 'advertisement'), request=request)
+        if not filterset.is_valid():
+            raise exceptions.ValidationError(filterset.errors)
+
+        paginator = KeysetPagination(('-created_at', '-id'))
+        page = paginator.paginate_queryset(filterset.qs, request, view=self)
+        response = paginator.get_paginated_response(InboxRentRequestSerializer(page, many=True).data)
+
+        # over every advertisement of the owner, not only the ones on this page
+        pending = rent_requests.filter(status=RentRequest.PENDING).order_by().values('advertisement_id', 'advertisement__title').annotate(total=Count('id'))
+        response.data['pending_counts'] = [
+            {'advertisement': row['advertisement_id'], 'title': row['advertisement__title'], 'pending': row['total']}
+            for row in pending
+        ]
+        return response
     
 
-class AdminDashboardViewSet(viewsets.ViewSet):
+class AdminDashboardViewSet(FastListMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
     permission_classes = [permissions.IsAdminUser]
+    serializer_class = AdvertisementSerializer
+    filter_backends = [DjangoFilterBackend, AdvertisementSearchFilter]
+    filterset_class = ModerationFilter
+    search_fields = ['title', 'description', 'location']
+    pagination_class = AdvertisementPagination
+
+    def get_queryset(self):
+        return Advertisement.objects.select_related('owner').prefetch_related('images')
 
     @swagger_auto_schema(
-        operation_summary='Only admin view the dashboard',
+        operation_summary='Only admin view the advertisements waiting for moderation',
+        operation_description='Only admin can view the paginated advertisement list, pending advertisements by default, with the same filters and search as the advertisement list'
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_summary='Only admin view the dashboard statistics',
         operation_description='Only admin can view all the statistics for this NestHunt project'
     )
-    def list(self, request):
-        today = now().date()
+    @action(detail=False, methods=['get'])
+    def statistics(self, request):
+        # totals come from the category counters, the month figures from the daily rollup plus the days since
+        totals = Category.objects.aggregate(
+            pending=Coalesce(Sum('pending_count'), 0),
+            approved=Coalesce(Sum('approved_count'), 0),
+            rejected=Coalesce(Sum('rejected_count'), 0)
+        )
+        today = localdate()
         first_day_current_month = today.replace(day=1)
-        first_day_last_month = (first_day_current_month - timedelta(days=1)).replace(day=1)
+        last_day_last_month = first_day_current_month - timedelta(days=1)
 
-        statistic = Advertisement.objects.aggregate(
-            total_advertisement=Count('id'),
-            total_pending_advertisement=Count('id', filter=Q(status='Pending')),
-            current_month_advertisement=Count('id', filter=Q(created_at__gte=first_day_current_month)),
-            last_month_advertisement=Count('id', filter=Q(created_at__gte=first_day_last_month, created_at__lt=first_day_current_month))
-        )
+        total_users = cache.get(DASHBOARD_USERS_KEY)
+        if total_users is None:
+            total_users = User.objects.count()
+            cache.set(DASHBOARD_USERS_KEY, total_users, settings.DASHBOARD_STATISTICS_TIMEOUT)
 
-        advertisement = Advertisement.objects.select_related('owner').prefetch_related('images').all();
+        return Response({
+            'total_advertisement': sum(totals.values()),
+            'total_pending_advertisement': totals['pending'],
+            'current_month_advertisement': statistics.range_totals(first_day_current_month, today)['advertisements'],
+            'last_month_advertisement': statistics.range_totals(last_day_last_month.replace(day=1), last_day_last_month)['advertisements'],
+            'total_users': total_users,
+            'payments_to_refund': PaymentCallback.objects.filter(status=PaymentCallback.REFUND_DUE).count(),
+            'statistics_rolled_up_to': statistics.last_rolled_date(),
+            'response_cache': caching.get_counters(caching.ADVERTISEMENTS, caching.CATEGORIES)
+        })
 
-        return Response({**statistic, 'total_users': User.objects.count(), 'advertisements': AdvertisementSerializer(advertisement, many=True).data})
+    @swagger_auto_schema(
+        operation_summary='Only admin view daily statistics for a date range',
+        operation_description='Only admin can view the totals, the totals per category and the per day figures of new users, advertisements by status, rent requests, orders and booked revenue between `start` and `end` (YYYY-MM-DD, the last 30 days by default)',
+        query_serializer=DashboardRangeSerializer
+    )
+    @action(detail=False, methods=['get'])
+    def timeseries(self, request):
+        serializer = DashboardRangeSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        start, end = serializer.validated_data['start'], serializer.validated_data['end']
+        # the days after the last rollup are counted once and shared by the three figures
+        live = statistics.live_daily(start, end)
+        return Response({
+            'start': start,
+            'end': end,
+            'rolled_up_to': statistics.last_rolled_date(),
+            'totals': statistics.range_totals(start, end, live),
+            'categories': statistics.category_totals(start, end, live),
+            'series': statistics.daily_series(start, end, live),
+        })
     
 
 # Custom User viewSet